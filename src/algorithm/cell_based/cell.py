@@ -10,27 +10,69 @@ class Cell(InstanceTracker):
     age_array: DynamicArray = DynamicArray()
     crowding_index_array: DynamicArray = DynamicArray()
     DivIVA_array: DynamicArray = DynamicArray()
+    colony_index_array: DynamicArray = DynamicArray(data_type=np.int32)   # Colony of each cell, -1 without colony
+    parent_index_array: DynamicArray = DynamicArray(data_type=np.int32)   # Parent of each cell, -1 for a root cell
+    state_index_array: DynamicArray = DynamicArray(data_type=np.int32)    # State of each cell, -1 before it has one
+    direction_array: DynamicArray = DynamicArray()                        # Direction of each cell in radians
+    length_array: DynamicArray = DynamicArray()                           # Length of each cell
     DivIVA_binding_rate: float = 0
 
     def __init__(self, center_position, end_position,
                  direction, length=1,
                  parent=None, state=None, colony_index=None):
         super().__init__()
-        self.state: State = state                           # Initial cell state, changes dynamic
-        self.parent: Cell = parent                          # Parent.end is start position
+        self.state_index_array.append(-1 if state is None else state.index)     # Initial cell state, changes dynamic
+        self.parent_index_array.append(-1 if parent is None else parent.index)  # Parent.end is start position
         self.children: list[Cell] = []                      # List of all the daughter cells (children)
         self.center_point_array.append(center_position)     # Center point of the cell, used for distance calculations
         self.end_point_array.append(end_position)           # End position, new cells grow relative from this point
-        self.direction: float = np.radians(direction)       # Direction the cell is facing (converts degrees to radians)
-        self.length: float = length                         # The length of the cell, from start position to end position
+        self.direction_array.append(np.radians(direction))  # Direction the cell is facing (converts degrees to radians)
+        self.length_array.append(length)                    # The length of the cell, from start position to end position
 
-        self.colony_index = colony_index
+        self.colony_index_array.append(-1 if colony_index is None else colony_index)
+        self.colony = None                                  # Direct reference to the colony, set by Colony.add_cell
+        self.grid_key: int = None                           # Spatial hash partition key, set on grid insertion
         self.extend_matrices()
 
     @property
     def age(self):
         return self.age_array[self.index]
 
+    @property
+    def state(self) -> State:
+        state_index = self.state_index_array.arr[self.index]
+        return None if state_index < 0 else State.instances[state_index]
+
+    @state.setter
+    def state(self, value: State):
+        self.state_index_array.arr[self.index] = -1 if value is None else value.index
+
+    @property
+    def parent(self) -> 'Cell':
+        parent_index = self.parent_index_array.arr[self.index]
+        return None if parent_index < 0 else self.instances[parent_index]
+
+    @parent.setter
+    def parent(self, value: 'Cell'):
+        self.parent_index_array.arr[self.index] = -1 if value is None else value.index
+
+    @property
+    def direction(self) -> float:
+        return self.direction_array.arr[self.index]
+
+    @property
+    def length(self) -> float:
+        return self.length_array.arr[self.index]
+
+    @property
+    def colony_index(self):
+        colony_index = self.colony_index_array.arr[self.index]
+        return None if colony_index < 0 else int(colony_index)
+
+    @colony_index.setter
+    def colony_index(self, value):
+        self.colony_index_array.arr[self.index] = -1 if value is None else value
+
     @property
     def center(self):
         return self.center_point_array[self.index]
@@ -85,6 +127,11 @@ class Cell(InstanceTracker):
         cls.age_array: DynamicArray = DynamicArray()
         cls.crowding_index_array: DynamicArray = DynamicArray()
         cls.DivIVA_array: DynamicArray = DynamicArray()
+        cls.colony_index_array: DynamicArray = DynamicArray(data_type=np.int32)
+        cls.parent_index_array: DynamicArray = DynamicArray(data_type=np.int32)
+        cls.state_index_array: DynamicArray = DynamicArray(data_type=np.int32)
+        cls.direction_array: DynamicArray = DynamicArray()
+        cls.length_array: DynamicArray = DynamicArray()
         cls.DivIVA_binding_rate: float = 0
 
     @classmethod
@@ -99,7 +146,7 @@ class Cell(InstanceTracker):
         new_cell = cls(
             cls.center_point_array[cell_index],
             cls.end_point_array[cell_index],
-            cell_data["direction"],
+            np.degrees(cell_data["direction"]),     # Stored in radians
             cell_data["length"],
             parent=parent,
             state=state,
@@ -1,11 +1,12 @@
 from abc import ABC, abstractmethod
 import numpy as np
-from numba import njit
+from numba import njit, prange
 import math
 
 from src.utils.benchmark_timer import Timer
 from src.utils.dynamic_array import Dynamic2DArray
 from src.algorithm.spatial.spatial_hashing import SpatialHashing
+from src.algorithm.spatial._kernels import filter_by_radius
 from src.algorithm.cell_based.cell import Cell
 from src.algorithm.cell_based.colony import Colony
 from src.algorithm.event.state import State
@@ -58,82 +59,118 @@ class SwitchState(Action):
     @action_timer.measure_decorator("SwitchState")
     def update(self, cell: Cell):
         cell.state = self.new_state
-        State.cell_mask_array[cell.index] = cell.state.event_mask
+        State.cell_mask_array.update_row(cell.index, cell.state.event_mask)
 
 
 class CollectValidNeighbours(Action):
     """Create a cash of all filtered neighbours"""
+    parallel_threshold: int = 50_000    # Number of candidate neighbours from where the parallel filter pays off
     neighbour_indexes_cache: np.ndarray = None
     neighbour_points_cache: np.ndarray = None
     distances_cache: np.ndarray = None
 
+    # Reused output buffers of the serial filter, the caches are views into these (valid until the next update)
+    _scratch_indexes: np.ndarray = np.empty(0, dtype=np.int32)
+    _scratch_points: np.ndarray = np.empty((0, 2))
+    _scratch_distances: np.ndarray = np.empty(0)
+
     @classmethod
     @action_timer.measure_decorator("CollectValidNeighbours")
     def update(cls, cell: Cell):
         with action_timer.measure("pickup data inds"):
             neighbour_indexes: np.ndarray = cls.get_all_neighbours(cell)
-        with action_timer.measure("pickup data points"):
-            # points: np.ndarray = Cell.center_point_array.get_points(neighbour_indexes)
-            points: np.ndarray = Cell.center_point_array[neighbour_indexes]
 
         # Filter based on distance
         with action_timer.measure("big calc"):
             max_dist = cls.space.partition_size
-            inds, dists = cls.compute_valid_neighbours(
-                cell.center, neighbour_indexes, points, max_dist
-            )
+            if neighbour_indexes.shape[0] < cls.parallel_threshold:
+                inds, valid_points, dists = cls.filter_valid_neighbours(cell.center, neighbour_indexes, max_dist)
+            else:
+                points: np.ndarray = Cell.center_point_array[neighbour_indexes]
+                inds, valid_points, dists = cls.compute_valid_neighbours_parallel(
+                    cell.center, neighbour_indexes, points, max_dist
+                )
 
         with action_timer.measure("save to cash"):
             # Store the new data inside the cashes
             cls.neighbour_indexes_cache = inds
-            cls.neighbour_points_cache = Cell.center_point_array[inds]
+            cls.neighbour_points_cache = valid_points
             cls.distances_cache = dists
 
     @staticmethod
     def get_all_neighbours(cell):
-        return Colony.instances[cell.colony_index].cell_grid.query(cell.center)
+        return cell.colony.cell_grid.query_by_key(cell.grid_key)
+
+    @classmethod
+    def filter_valid_neighbours(cls, cell_center: np.ndarray, neighbour_indexes: np.ndarray,
+                                max_dist: float) -> (np.ndarray, np.ndarray, np.ndarray):
+        """
+        Filter the neighbours within max_dist straight from the global center point array into the reused scratch buffers (grown when there are more candidates than they can hold).
+
+        :param cell_center: 2D coordinates of the target cell
+        :param neighbour_indexes: Array of indices of potential valid neighbours
+        :param max_dist: filter distance from target cell, exclude neighbour if distance is greater than the max
+        :return: Views of the valid neighbours, their points and their distances (arrays are coupled element wise)
+        """
+        n = neighbour_indexes.shape[0]
+        if n > cls._scratch_indexes.shape[0]:
+            capacity = max(n, 2 * cls._scratch_indexes.shape[0])
+            cls._scratch_indexes = np.empty(capacity, dtype=np.int32)
+            cls._scratch_points = np.empty((capacity, 2))
+            cls._scratch_distances = np.empty(capacity)
+
+        count = filter_by_radius(Cell.center_point_array.arr, cell_center, neighbour_indexes, max_dist,
+                                 cls._scratch_indexes, cls._scratch_points, cls._scratch_distances)
+        return cls._scratch_indexes[:count], cls._scratch_points[:count], cls._scratch_distances[:count]
 
     @staticmethod
-    @action_timer.measure_decorator("compute_valid_neighbours")
-    @njit(fastmath=True)
-    def compute_valid_neighbours(cell_center: np.ndarray,
-                                 neighbour_indexes: np.ndarray,
-                                 neighbour_points: np.ndarray,
-                                 max_dist: float) -> (np.ndarray, np.ndarray):
+    @action_timer.measure_decorator("compute_valid_neighbours_parallel")
+    @njit(parallel=True, fastmath=True)
+    def compute_valid_neighbours_parallel(cell_center: np.ndarray,
+                                          neighbour_indexes: np.ndarray,
+                                          neighbour_points: np.ndarray,
+                                          max_dist: float) -> (np.ndarray, np.ndarray, np.ndarray):
         """
-        Filters and returns valid neighboring cells within a specified maximum distance
-        from the target cell, along with their distances.
+        Multithreaded version of filter_valid_neighbours, only worth it for a large number of neighbours.
+        First marks the valid neighbours in parallel, then a prefix sum gives each valid neighbour
+        its output position so the results are written in parallel in the same order.
 
         :param cell_center: 2D coordinates of the target cell
         :param neighbour_indexes: Array of indices of potential valid neighbours
         :param neighbour_points: 2D coordinates of the potential neighbours
         :param max_dist: filter distance from target cell, exclude neighbour if distance is greater than the max
-        :return: Array of valid neighbours, array of valid distances (arrays are coupled element wise)
+        :return: Array of valid neighbours, their points and their distances (arrays are coupled element wise)
         """
-        # Allocate memory space
         n = neighbour_points.shape[0]
-        valid_indexes = np.empty(n, dtype=neighbour_indexes.dtype)
-        valid_distances = np.empty(n, dtype=neighbour_points.dtype)
-
-        count = 0                                   # Total number of valid neighbours
-        cx, cy = cell_center[0], cell_center[1]     # Cache cell values
+        cx, cy = cell_center[0], cell_center[1]
         max_sq_dist = max_dist * max_dist
-        for i in range(n):
-            # Relative displacement
+
+        # Pass 1: mark valid neighbours
+        valid_mask = np.empty(n, dtype=np.bool_)
+        dists_squared = np.empty(n, dtype=neighbour_points.dtype)
+        for i in prange(n):
             dx = neighbour_points[i, 0] - cx
             dy = neighbour_points[i, 1] - cy
-
-            # Distance squared (skip square root calculations for invalid distances)
-            dist_squared = dx * dx + dy * dy
-
-            # Filter if dist^2 <= max_dist^2 (same as dist <= max_dist)
-            if dist_squared <= max_sq_dist:
-                valid_indexes[count] = neighbour_indexes[i]
-                valid_distances[count] = dist_squared ** 0.5
-                count += 1
-
-        # Trim to correct size
-        return valid_indexes[:count], valid_distances[:count]
+            dists_squared[i] = dx * dx + dy * dy
+            valid_mask[i] = dists_squared[i] <= max_sq_dist
+
+        # Pass 2: output position of each valid neighbour
+        positions = np.cumsum(valid_mask)
+        count = positions[-1] if n > 0 else 0
+
+        # Pass 3: write the valid neighbours
+        valid_indexes = np.empty(count, dtype=neighbour_indexes.dtype)
+        valid_points = np.empty((count, 2), dtype=neighbour_points.dtype)
+        valid_distances = np.empty(count, dtype=neighbour_points.dtype)
+        for i in prange(n):
+            if valid_mask[i]:
+                j = positions[i] - 1
+                valid_indexes[j] = neighbour_indexes[i]
+                valid_points[j, 0] = neighbour_points[i, 0]
+                valid_points[j, 1] = neighbour_points[i, 1]
+                valid_distances[j] = math.sqrt(dists_squared[i])
+
+        return valid_indexes, valid_points, valid_distances
 
     @staticmethod
     @action_timer.measure_decorator("compute_distance")
@@ -153,8 +190,7 @@ class CollectValidNeighbours(Action):
         for i in range(n):
             dx = neighbour_points[i, 0] - tx
             dy = neighbour_points[i, 1] - ty
-            distance = (dx * dx + dy * dy) ** 0.5
-            distances[i] = distance
+            distances[i] = math.sqrt(dx * dx + dy * dy)
 
         return distances
 
@@ -279,6 +315,11 @@ class GrowCell(Action, CellGeometryCalculator, TropismCalculator):
         self.relation_actions = dou_actions
         self.get_neighbours: bool = get_neighbours
 
+        # Bind the update methods once, the action lists are fixed after initialization
+        self._parent_updates = tuple(action.update for action in parent_cell_actions)
+        self._new_updates = tuple(action.update for action in new_cell_actions)
+        self._relation_updates = tuple(duo_action.update for duo_action in dou_actions)
+
         # Use by default class value, else use given value
         cell_length = cell_length if cell_length is not None else self.cell_length
         angle_deviation = angle_deviation if angle_deviation is not None else self.angle_deviation
@@ -312,12 +353,12 @@ class GrowCell(Action, CellGeometryCalculator, TropismCalculator):
 
     def _execute_all_actions(self, parent: Cell, child: Cell):
         """Execute the parent, new cell and intercellular actions."""
-        for action in self.parent_actions:
-            action.update(parent)
-        for action in self.new_actions:
-            action.update(child)
-        for duo_action in self.relation_actions:
-            duo_action.update(parent, child)
+        for update in self._parent_updates:
+            update(parent)
+        for update in self._new_updates:
+            update(child)
+        for update in self._relation_updates:
+            update(parent, child)
 
     @staticmethod
     def _link_new_cell(parent: Cell, child: Cell) -> None:
@@ -328,12 +369,12 @@ class GrowCell(Action, CellGeometryCalculator, TropismCalculator):
         :param child: The newly added cell that joins the parent's colony.
         """
         parent.link_child(child)
-        Colony.instances[parent.colony_index].add_cell(child)
+        parent.colony.add_cell(child)
 
     def add_base(self):
         self.event_propensities.append(0)
         self.state_mask.append(0)
-        self.condition_factors.append(0)
+        self.condition_factors.append()    # Column defaults, e.g. alpha for constant conditions
 
 
 class AddDivIVA(Action):
@@ -348,6 +389,8 @@ class AddDivIVA(Action):
 class CrowdingIndex(Action):
     crowding_steepness = 0
     spacing = 0
+    _inv_steepness = 0      # 1 / crowding_steepness
+    _log_spacing = 0        # log(spacing), folded into the exponent of the crowding index
 
     def __init__(self, condition: Condition, alpha: float = 0):
         self.condition_index: int = condition.index     # The condition index that stores the crowding factor
@@ -359,40 +402,66 @@ class CrowdingIndex(Action):
         distances = CollectValidNeighbours.distances_cache
 
         crowding_values = self.calc_base_crowding_index(distances)
-        self.add_crowding(cell.index, neighbour_indexes, crowding_values, Cell.crowding_index_array.active)
-        self._set_condition_factor(cell, neighbour_indexes)
+        self.update_crowding_and_factor(
+            cell.index,
+            neighbour_indexes,
+            crowding_values,
+            Cell.crowding_index_array.active,
+            self.condition_factors.active[:, self.condition_index],
+            self.alpha
+        )
+        Condition.mark_dirty(neighbour_indexes)
+        Condition.mark_dirty(cell.index)
 
     @staticmethod
     @action_timer.measure_decorator("Add crowding")
     @njit
-    def add_crowding(cell_idx, neighbour_indexes, crowding_values, crowding_index_array):
+    def update_crowding_and_factor(cell_idx, neighbour_indexes, crowding_values,
+                                   crowding_index_array, factor_column, alpha):
+        """
+        Add the crowding values to the neighbours and the target cell,
+        and directly update their crowding factor 1 / (1 + crowding * alpha) in the same pass.
+
+        :param cell_idx: Index of the target cell, receives the sum of all crowding values.
+        :param neighbour_indexes: Indexes of the valid neighbours.
+        :param crowding_values: Crowding value for each neighbour (coupled element wise with the indexes).
+        :param crowding_index_array: Crowding index of all cells, updated in place.
+        :param factor_column: Condition factor column of the crowding condition, updated in place.
+        :param alpha: The strength value for the crowding factor intensity.
+        """
         total = 0.0
-        for i, n_ind in enumerate(neighbour_indexes):
+        for i in range(neighbour_indexes.shape[0]):
+            n_ind = neighbour_indexes[i]
             val = crowding_values[i]
             crowding_index_array[n_ind] += val
+            factor_column[n_ind] = 1.0 / (1.0 + crowding_index_array[n_ind] * alpha)
             total += val
         crowding_index_array[cell_idx] += total
+        factor_column[cell_idx] = 1.0 / (1.0 + crowding_index_array[cell_idx] * alpha)
 
-    def _calc_crowding_factor(self, crowding: float or np.ndarray) -> float or np.ndarray:
-        return 1 / (1 + (crowding * self.alpha))
+    @classmethod
+    def set_crowding_parameters(cls, steepness: float, spacing: float) -> None:
+        """
+        Set the crowding parameters together with their precomputed forms used by calc_base_crowding_index.
 
-    def _set_condition_factor(self, cell: Cell, neighbour_indexes):
-        # Set the crowding factor for the neighbours
-        self.condition_factors[neighbour_indexes, self.condition_index] = self._calc_crowding_factor(
-            Cell.crowding_index_array[neighbour_indexes])
-        # Set the crowding factor for the target cell
-        self.condition_factors[cell.index, self.condition_index] = self._calc_crowding_factor(
-            Cell.crowding_index_array[cell.index])
+        :param steepness: Controls the crowding influence radius.
+        :param spacing: Segment length of a cell, scales the crowding index.
+        """
+        cls.crowding_steepness = steepness
+        cls.spacing = spacing
+        cls._inv_steepness = 1.0 / steepness
+        cls._log_spacing = math.log(spacing)
 
     @classmethod
     def calc_base_crowding_index(cls, distances: np.ndarray) -> np.ndarray:
         """
-        Calculates the crowding index.
+        Calculates the crowding index, exp(-d / steepness) * spacing.
+        The spacing is folded into the exponent to skip a division and multiplication per neighbour.
 
         :param distances: array of distances of neighbouring cells.
         :return: crowding index values
         """
-        return np.exp(-distances / cls.crowding_steepness) * cls.spacing
+        return np.exp(-distances * cls._inv_steepness + cls._log_spacing)
 
     @classmethod
     def calculate_query_size(cls, error_tolerance: float) -> float:
@@ -530,30 +599,17 @@ class Fragment(Action):
 
     @action_timer.measure_decorator("Fragment")
     def update(self, cell: Cell):
-        print(f"WE FRAGMENT {cell.index} / {Cell.total}")
         self.split_from_parent(cell)
 
         branch = self.form_branch(cell)
-        print("all same colony", all([cell.colony_index == bcell.colony_index for bcell in branch]))
-        print(f"branch size {len(branch)}")
-
         self.full_remove_branch_from_colony(cell, branch)
 
         new_colony = Colony(cell)
         new_colony.add_branch(branch[1:])
-        print("min new", min(Cell.crowding_index_array[new_colony.cell_indexes]))
-        print("max new", max(Cell.crowding_index_array[new_colony.cell_indexes]))
 
     def full_remove_branch_from_colony(self, cell: Cell, branch):
         # Get the colony
-        old_colony: Colony = Colony.instances[cell.colony_index]
-
-        crowding_col = Cell.crowding_index_array[old_colony.cell_indexes]
-        min_crowding = min(crowding_col)
-        max_crowding = max(crowding_col)
-
-        print("min old pre", min_crowding)
-        print("max old pre", max_crowding)
+        old_colony: Colony = cell.colony
 
         # Remove the crowding values from the old colony
         self.remove_crowding(branch)
@@ -561,9 +617,6 @@ class Fragment(Action):
         # Decouple cell indexes from the colony
         old_colony.remove_branch(branch)
 
-        print("min old pos", min(Cell.crowding_index_array[old_colony.cell_indexes]))
-        print("max old pos", max(Cell.crowding_index_array[old_colony.cell_indexes]))
-
     def split_from_parent(self, cell):
         """
         Decouple the cell from the parent.
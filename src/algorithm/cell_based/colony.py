@@ -1,16 +1,23 @@
 import numpy as np
-from src.utils.dynamic_array import DynamicArray
+from scipy.spatial import ConvexHull
+from src.utils.dynamic_array import DynamicArray, Dynamic2DArray
 from src.utils.instance_tracker import InstanceTracker
 from src.algorithm.spatial.spatial_hashing import SpatialHashing
+from src.algorithm.spatial._kernels import monotone_chain
 from src.algorithm.cell_based.cell import Cell
 
 
 class Colony(InstanceTracker):
+    qhull_threshold: int = 1000     # From this many points QHull beats the monotone chain despite its setup cost
+
     def __init__(self, root_cell: Cell):
         super().__init__()
         self.root: Cell = root_cell
         self.cell_indexes: DynamicArray = DynamicArray(data_type=np.int32)
+        self.cell_point_array: Dynamic2DArray = Dynamic2DArray(64, 2)     # Center points in cell_indexes order
         self.cell_grid: SpatialHashing = SpatialHashing()
+        self.hull_points: np.ndarray = np.empty((0, 2))     # Convex hull vertices of the first hull_cell_count cells
+        self.hull_cell_count: int = 0
         self.add_cell(self.root)
 
     @property
@@ -19,28 +26,89 @@ class Colony(InstanceTracker):
 
     @property
     def cell_points(self) -> np.ndarray:
-        return Cell.center_point_array[self.cell_indexes]
+        return self.cell_point_array.active
+
+    def reserve(self, capacity: int) -> None:
+        """
+        Reserve room for the given number of cells in the colony arrays, so they don't resize while the colony grows.
+
+        :param capacity: Expected number of cells in the colony.
+        """
+        self.cell_indexes.reserve(capacity)
+        self.cell_point_array.reserve(capacity)
 
     def add_cell(self, cell: Cell):
         cell.colony_index = self.index
+        cell.colony = self
         self.cell_indexes.append(cell.index)
+        self.cell_point_array.append(cell.center)
         self.cell_grid.insert(cell)
 
     def add_branch(self, branch: list[Cell]):
+        """Add multiple cells at once, the cell indexes and spatial grid are extended in bulk."""
         for cell in branch:
-            self.add_cell(cell)
+            cell.colony = self
 
-    def remove_branch(self, branch):
-        branch_inds: list[int] = []
-        key_group: dict[tuple[int, int], list[int]] = {}
-        for cell in branch:
-            key = self.cell_grid.get_cell_key(cell.center)
-            index = cell.index
-            key_group[key] = index
-            branch_inds.append(index)
-        self.cell_indexes.batch_remove(branch_inds)
-        for grid_key, remove_inds in key_group.items():
-            self.cell_grid.grid[grid_key].batch_remove(remove_inds)
+        branch_inds: np.ndarray = np.array([cell.index for cell in branch], dtype=np.int32)
+        Cell.colony_index_array.arr[branch_inds] = self.index
+        branch_points: np.ndarray = Cell.center_point_array[branch_inds]
+        self.cell_indexes.extend(branch_inds)
+        self.cell_point_array.extend(branch_points)
+        keys: np.ndarray = self.cell_grid.bulk_insert(branch_points, branch_inds)
+        for cell, cell_key in zip(branch, keys.tolist()):
+            cell.grid_key = cell_key
+
+    def remove_branch(self, branch: list[Cell]):
+        """
+        Remove all cells of the branch from the colony and its spatial grid.
+        Cells are grouped per grid partition, so each partition only does one batch removal.
+        """
+        branch_inds: np.ndarray = np.array([cell.index for cell in branch], dtype=np.int32)
+        keys: np.ndarray = self.cell_grid.get_cell_keys(Cell.center_point_array[branch_inds])
+        unique_keys, key_groups = np.unique(keys, return_inverse=True)
+
+        keep: np.ndarray = ~np.isin(self.cell_indexes.active, branch_inds)
+        self.cell_point_array.keep_rows(keep)
+        self.cell_indexes.keep_rows(keep)
+        self.reset_hull()   # Removed cells can be hull vertices, rebuild from scratch on the next update
+        for group, cell_key in enumerate(unique_keys):
+            self.cell_grid.grid[int(cell_key)].batch_remove(branch_inds[key_groups == group])
+
+    def update_hull(self) -> np.ndarray:
+        """
+        Update the convex hull with the cells added since the last update.
+        The hull of all cells equals the hull of the previous hull vertices plus the new points,
+        so only those are passed to QHull instead of every cell.
+
+        :return: Convex hull vertices of all cells in the colony (all points when there are less than 3).
+        """
+        new_points: np.ndarray = self.cell_point_array.active[self.hull_cell_count:]
+        candidates: np.ndarray = np.concatenate((self.hull_points, new_points))
+        self.hull_cell_count = self.cell_count
+
+        self.hull_points = self.convex_hull_vertices(candidates)
+        return self.hull_points
+
+    @classmethod
+    def convex_hull_vertices(cls, points: np.ndarray) -> np.ndarray:
+        """
+        Convex hull vertices of the points in counter-clockwise order.
+        Small point sets use a monotone chain, larger ones QHull.
+
+        :param points: Points, one (x, y) per row.
+        :return: Hull vertices (all points when there are less than 3).
+        """
+        if len(points) < 3:
+            return points
+        if len(points) >= cls.qhull_threshold:
+            return points[ConvexHull(points).vertices]
+
+        order: np.ndarray = np.lexsort((points[:, 1], points[:, 0]))
+        return points[order[monotone_chain(np.ascontiguousarray(points[order], dtype=np.float64))]]
+
+    def reset_hull(self):
+        self.hull_points = np.empty((0, 2))
+        self.hull_cell_count = 0
 
     @classmethod
     def get_cell_indexes(cls, colony_ind: int):
@@ -48,7 +116,7 @@ class Colony(InstanceTracker):
 
     @classmethod
     def get_all_neighbours(cls, cell: Cell):
-        return cls.instances[cell.colony_index].cell_grid.query(cell.center)
+        return cell.colony.cell_grid.query_by_key(cell.grid_key)
 
     @classmethod
     def load_data(cls, colony_data: dict[str, int or list[int]]):
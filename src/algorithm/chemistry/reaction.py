@@ -1,19 +1,44 @@
 import numpy as np
-from math import factorial
+from math import factorial, prod
+from src.utils.dynamic_array import DynamicArray
 from src.utils.instance_tracker import InstanceTracker
 from src.algorithm.chemistry.element import Element
 
 
 class Reaction(InstanceTracker):
+    __slots__ = ("index", "name", "rate", "reactants", "products", "_reactant_plan", "_prefactor")
+    propensity_array: DynamicArray = DynamicArray(capacity=10)
+    rate_array: DynamicArray = DynamicArray(capacity=10)
+    stoichiometry_matrix: np.ndarray = np.zeros((0, 0), dtype=np.int64)     # Reactions as rows and Elements as columns
+    # Reactants per reaction, padded to the largest reactant count (padding has element 0 and coefficient 0)
+    reactant_element_table: np.ndarray = np.zeros((0, 0), dtype=np.int64)
+    reactant_coefficient_table: np.ndarray = np.zeros((0, 0), dtype=np.int64)
+    propensity_prefactors: np.ndarray = np.ones(0)    # Rate over the coefficient factorials of every reaction
+
     def __init__(self, name: str, rate: float,
                  reactants: dict[Element, int],
                  products: dict[Element, int]):
         super().__init__()
         self.name: str = name
-        self.rate: np.float64 = np.float64(rate)
+        self.rate: float = float(rate)     # Plain float, avoids numpy scalar boxing in the per reaction math
         self.reactants: dict[Element, int] = reactants
         self.products: dict[Element, int] = products
-        self.propensity: np.float64 = np.float64(0)
+        # Reactants with the inverse factorial of their coefficient, so it isn't recomputed on every propensity update
+        self._reactant_plan: list[tuple[Element, int, float]] = [
+            (element, coefficient, 1.0 / factorial(coefficient)) for element, coefficient in reactants.items()
+        ]
+        # Rate divided by all coefficient factorials, so only the falling factorials are left per update
+        self._prefactor: float = self.rate * prod(inv_factorial for _, _, inv_factorial in self._reactant_plan)
+        self.propensity_array.append(0)
+        self.rate_array.append(self.rate)
+
+    @property
+    def propensity(self) -> float:
+        return float(self.propensity_array.arr[self.index])
+
+    @propensity.setter
+    def propensity(self, value):
+        self.propensity_array.arr[self.index] = value
 
     def __str__(self) -> str:
         return f"Reaction({self.name}, prop.:{self})"
@@ -30,15 +55,74 @@ class Reaction(InstanceTracker):
     def calc_reactorial_count(self) -> float:
         """Calculates all distinct combinations of the reactants."""
         h = 1.0
-        for element, coefficient in self.reactants.items():
+        for element, coefficient, inv_factorial in self._reactant_plan:
+            amount = element.amount
             if coefficient == 1:
-                h *= element.amount
+                h *= amount
             elif coefficient == 2:
-                h *= element.amount * (element.amount - 1) / 2
+                h *= amount * (amount - 1) / 2
             else:
-                factors = np.arange(element.amount, element.amount - coefficient, -1, dtype=np.float64)
-                h *= np.prod(factors) / factorial(coefficient)
+                falling_factorial = 1.0
+                for k in range(coefficient):
+                    falling_factorial *= amount - k
+                h *= falling_factorial * inv_factorial
         return h
 
     def calc_propensity(self) -> None:
-        self.propensity = self.rate * self.calc_reactorial_count()
+        h = 1.0
+        for element, coefficient, _ in self._reactant_plan:
+            amount = element.amount
+            for k in range(coefficient):
+                h *= amount - k
+        self.propensity = self._prefactor * h
+
+    @classmethod
+    def build_stoichiometry_matrix(cls) -> None:
+        """
+        Store the reactant coefficients of all reactions in a single matrix, and the reactants of every reaction
+        in padded tables (element index and coefficient) next to the constant prefactor of each reaction,
+        so the propensities of every reaction can be calculated in one vectorized pass.
+        """
+        cls.stoichiometry_matrix = np.zeros((cls.total, Element.total), dtype=np.int64)
+        for reaction in cls.instances:
+            for element, coefficient in reaction.reactants.items():
+                cls.stoichiometry_matrix[reaction.index, element.index] = coefficient
+
+        max_reactants = max((len(reaction.reactants) for reaction in cls.instances), default=0)
+        cls.reactant_element_table = np.zeros((cls.total, max_reactants), dtype=np.int64)
+        cls.reactant_coefficient_table = np.zeros((cls.total, max_reactants), dtype=np.int64)
+        for reaction in cls.instances:
+            for column, (element, coefficient, _) in enumerate(reaction._reactant_plan):
+                cls.reactant_element_table[reaction.index, column] = element.index
+                cls.reactant_coefficient_table[reaction.index, column] = coefficient
+
+        cls.propensity_prefactors = np.array([reaction._prefactor for reaction in cls.instances], dtype=np.float64)
+
+    @classmethod
+    def calc_all_propensities(cls) -> None:
+        """
+        Calculate the propensity of all reactions at once.
+
+        The distinct reactant combinations per element are the falling factorial of the element amount over the
+        coefficient divided by the factorial of the coefficient, the product over all elements times the rate gives
+        the propensity. The rate and factorials are folded into one prefactor per reaction.
+        """
+        amounts = np.fromiter((element.amount for element in Element.instances),
+                              dtype=np.float64, count=Element.total)
+        reactant_amounts = amounts[cls.reactant_element_table]     # Only the reactants, not every element
+
+        falling_factorials = np.ones(reactant_amounts.shape)
+        for k in range(cls.reactant_coefficient_table.max(initial=0)):
+            falling_factorials *= np.where(k < cls.reactant_coefficient_table, reactant_amounts - k, 1.0)
+
+        cls.propensity_array.active = cls.propensity_prefactors * np.prod(falling_factorials, axis=1)
+
+    @classmethod
+    def reset_class(cls):
+        super().reset_class()
+        cls.propensity_array = DynamicArray(capacity=10)
+        cls.rate_array = DynamicArray(capacity=10)
+        cls.stoichiometry_matrix = np.zeros((0, 0), dtype=np.int64)
+        cls.reactant_element_table = np.zeros((0, 0), dtype=np.int64)
+        cls.reactant_coefficient_table = np.zeros((0, 0), dtype=np.int64)
+        cls.propensity_prefactors = np.ones(0)
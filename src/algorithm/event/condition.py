@@ -1,18 +1,33 @@
 import numpy as np
-from numba import njit
+from numba import njit, prange
 from src.utils.dynamic_array import DynamicArray, Dynamic2DArray
 from src.utils.instance_tracker import InstanceTracker
 from src.algorithm.cell_based.cell import Cell
 
+# Factor column is a (strided) column view of the condition factor matrix, the parameter column is contiguous
+CONDITION_KERNEL_SIGNATURE = "void(float32[:], float64[::1], float64, float64)"
+
+
+@njit(CONDITION_KERNEL_SIGNATURE, parallel=True, fastmath=True, boundscheck=False, cache=True)
+def _calc_powerlaw(factor_column, param_column, alpha, threshold):
+    for i in prange(factor_column.shape[0]):
+        factor_column[i] = max(param_column[i] - threshold, 0) ** alpha
+
+
+@njit(CONDITION_KERNEL_SIGNATURE, parallel=True, fastmath=True, boundscheck=False, cache=True)
+def _calc_exponential(factor_column, param_column, alpha, threshold):
+    for i in prange(factor_column.shape[0]):
+        factor_column[i] = np.exp(max(param_column[i] - threshold, 0) * alpha)
+
 
 class Condition(InstanceTracker):
-    cell_condition_factor_array: Dynamic2DArray = Dynamic2DArray()
-    METHOD_MODES = {
-        "constant": 0,
-        "linear": 1,
-        "powerlaw": 2,
-        "exponential": 3,
+    cell_condition_factor_array: Dynamic2DArray = Dynamic2DArray(data_type=np.float32)
+    METHOD_KERNELS = {     # Kernels for the methods that need exp/pow, linear uses plain NumPy
+        "powerlaw": _calc_powerlaw,
+        "exponential": _calc_exponential,
     }
+    CONTINUOUS_PARAMETERS = ("age", "DivIVA")   # Cell parameters that change for every cell each time step
+    dirty_cells: set[int] = set()               # Cells whose event driven parameters changed since the last update
 
     def __init__(self, name: str, method_name: str, parameter: str, alpha: float = 1, threshold=1):
         super().__init__()
@@ -24,6 +39,24 @@ class Condition(InstanceTracker):
         self.alpha: float = alpha
         self.threshold: float = threshold
 
+        # Constant conditions are written once as the column default instead of every step
+        if self.method_name == "constant":
+            self.cell_condition_factor_array.set_column_default(self.index, alpha)
+
+        self.event_driven: bool = parameter not in self.CONTINUOUS_PARAMETERS   # Only dirty cells need an update
+        self.computed_rows: int = 0     # Number of cells whose factor has been calculated at least once
+
+        # Cache the views on the backing arrays, refreshed when one of the arrays is reallocated
+        self._factor_view: np.ndarray = np.empty(0)
+        self._param_view: np.ndarray = np.empty(0)
+        self.cell_condition_factor_array.on_resize(self._refresh_views)
+        self.param_arr.on_resize(self._refresh_views)
+        self._refresh_views()
+
+    def _refresh_views(self):
+        self._factor_view = self.cell_condition_factor_array.arr[:, self.index]
+        self._param_view = self.param_arr.arr
+
     @property
     def factor(self) -> np.ndarray:
         return self.cell_condition_factor_array[:, self.index]
@@ -37,38 +70,82 @@ class Condition(InstanceTracker):
     #                out=self.factor)
 
     def calc_factor(self):
-        # Quick return if condition is static
-        if self.method_name == "static":
+        # Quick return if condition is static or constant
+        if self.method_name in ("static", "constant"):
+            return
+
+        if self.event_driven and self.computed_rows > 0:
+            self.calc_factor_rows(self.get_dirty_rows())
+        else:
+            n = self.param_arr.row_size
+            self.write_factor(self._factor_view[:n], self._param_view[:n])
+
+        self.computed_rows = self.param_arr.row_size
+
+    def get_dirty_rows(self) -> np.ndarray:
+        """
+        :return: Indexes of the marked dirty cells and the cells added since the last update.
+        """
+        new_rows = np.arange(self.computed_rows, self.param_arr.row_size)
+        if not self.dirty_cells:
+            return new_rows
+
+        dirty_rows = np.fromiter(self.dirty_cells, dtype=np.int64, count=len(self.dirty_cells))
+        return np.union1d(dirty_rows, new_rows)
+
+    def calc_factor_rows(self, rows: np.ndarray):
+        """
+        Recalculate the factor of only the given cells.
+
+        :param rows: Indexes of the cells to update.
+        """
+        if rows.size == 0:
             return
 
-        mode = self.METHOD_MODES[self.method_name]
-        self.update_condition_factors_turbo(
-            self.cell_condition_factor_array[:, self.index],
-            self.param_arr.active,
+        factor_rows = np.empty(rows.size, dtype=self.cell_condition_factor_array.dtype)
+        self.write_factor(factor_rows, self._param_view[rows])
+        self._factor_view[rows] = factor_rows
+
+    def write_factor(self, factor_column: np.ndarray, param_column: np.ndarray):
+        """
+        Write the condition factor of the given parameter values into the factor column.
+
+        :param factor_column: Output column, matches the parameter column in length.
+        :param param_column: Cell parameter values the factor is based on.
+        """
+        if self.method_name == "linear":
+            np.subtract(param_column, self.threshold, out=factor_column)
+            np.maximum(factor_column, 0, out=factor_column)
+            factor_column *= self.alpha
+            return
+
+        # Dispatch once to the kernel specialized for the condition method
+        self.METHOD_KERNELS[self.method_name](
+            factor_column,
+            param_column,
             self.alpha,
-            self.threshold,
-            mode
+            self.threshold
         )
 
-    @staticmethod
-    @njit
-    def update_condition_factors_turbo(factor_column, param_column, alpha, threshold, mode: int):
+    @classmethod
+    def mark_dirty(cls, cell_indexes):
         """
-        mode: 0 = constant, 1 = linear, 2 = powerlaw, 3 = exponential
+        Flag cells whose event driven parameters changed, so their factors are recalculated in the next update.
+
+        :param cell_indexes: Single cell index or array of cell indexes.
         """
-        for i in range(factor_column.shape[0]):
-            val = max(param_column[i] - threshold, 0)
-            if mode == 0:
-                factor_column[i] = alpha
-            elif mode == 1:
-                factor_column[i] = val * alpha
-            elif mode == 2:
-                factor_column[i] = val ** alpha
-            elif mode == 3:
-                factor_column[i] = np.exp(val * alpha)
+        if np.isscalar(cell_indexes):
+            cls.dirty_cells.add(int(cell_indexes))
+        else:
+            cls.dirty_cells.update(np.asarray(cell_indexes).tolist())
+
+    @classmethod
+    def clear_dirty_cells(cls):
+        cls.dirty_cells = set()
 
     @classmethod
     def reset_class(cls):
         super().reset_class()
-        cls.cell_condition_factor_array = Dynamic2DArray()
+        cls.cell_condition_factor_array = Dynamic2DArray(data_type=np.float32)
+        cls.dirty_cells = set()
 
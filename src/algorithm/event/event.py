@@ -1,19 +1,28 @@
 import numpy as np
 from bisect import bisect_left
-from src.utils.dynamic_array import Dynamic2DArray
+from src.utils.dynamic_array import DynamicArray, Dynamic2DArray
 from src.utils.instance_tracker import InstanceTracker
 from src.algorithm.cell_based.cell import Cell
 from src.algorithm.cell_based.cell_action import Action, SwitchState
 from src.algorithm.chemistry.reaction import Reaction
 from src.algorithm.event.state import State
 from src.algorithm.event.condition import Condition
+from src.algorithm.event import fenwick
 
 from numba import njit
 
 
 class Event(InstanceTracker):
-    event_propensities_array: Dynamic2DArray = Dynamic2DArray()
-    conditions_indexes_array: Dynamic2DArray = Dynamic2DArray(capacity_columns=Condition.total)
+    event_propensities_array: Dynamic2DArray = Dynamic2DArray(data_type=np.float32)
+    reaction_index_array: DynamicArray = DynamicArray(capacity=16, data_type=np.int64)     # Reaction index per event
+    event_condition_mask_array: Dynamic2DArray = Dynamic2DArray(data_type=np.bool_)     # Events as rows and Conditions as columns
+    linked_conditions_array: Dynamic2DArray = Dynamic2DArray(capacity_rows=16, capacity_columns=2, data_type=np.int64)  # (event, condition) pairs of the mask
+    _propensity_tree: np.ndarray = np.zeros(1)      # Fenwick tree over the flattened event propensity array
+    _synced_propensities: np.ndarray = np.zeros(0)  # Propensities currently stored in the tree
+    _synced_size: int = 0
+    _steps_since_rebuild: int = 0
+    tree_rebuild_interval: int = 10_000             # Rebuild the tree periodically to flush accumulated rounding
+    _row_sums: np.ndarray = None                    # Total propensity per cell, cleared when the propensities change
 
     def __init__(self, name: str,
                  ingoing_states: list[State],
@@ -28,22 +37,16 @@ class Event(InstanceTracker):
         self.conditions_indexes: list[int] = [condition.index for condition in conditions]
         self.action: Action = action
         self.reaction: Reaction = chemical_channel
+        self.reaction_index_array.append(chemical_channel.index)
 
         self.add_state_mask()                       # Link the ingoing states with the current event
+        self.add_condition_mask()                   # Link the conditions with the current event
         self.event_propensities_array.add_column()  # Add a extra column in the event propensity array
 
     @property
     def propensity(self) -> np.ndarray:
         return self.event_propensities_array[:, self.index]
 
-    def update_propensity(self):
-        # Use reaction propensity as base
-        self.event_propensities_array[:, self.index] = self.reaction.propensity
-
-        # Combine the condition factors
-        for ind in self.conditions_indexes:
-            self.event_propensities_array[:, self.index] *= Condition.cell_condition_factor_array[:, ind]
-
     def update(self, cell: Cell):
         # Chemical channel update
         self.reaction.react()
@@ -54,6 +57,17 @@ class Event(InstanceTracker):
         # Update the state of the cell
         self.out_state.update(cell)
 
+    def add_condition_mask(self):
+        # Make sure there is a column for every condition
+        while self.event_condition_mask_array.ccols < Condition.total:
+            self.event_condition_mask_array.add_column()
+
+        # Add a new row for the current event and flag the conditions that affect it
+        self.event_condition_mask_array.append(False)
+        self.event_condition_mask_array[self.index, self.conditions_indexes] = True
+        for cond_ind in sorted(set(self.conditions_indexes)):
+            self.linked_conditions_array.append((self.index, cond_ind))
+
     def add_state_mask(self):
         # Add a new column for current event to the event masks
         State.event_mask_array.add_column()
@@ -63,49 +77,109 @@ class Event(InstanceTracker):
         for in_state in self.ingoing_states:
             in_state.add_event_mask(self.index)
 
+    @classmethod
+    def update_all_propensities(cls):
+        """
+        Update the propensity of every cell-event at once.
+
+        Every column starts from the reaction propensity of its event, masked by the cell states that can execute
+        the event, and is then multiplied by the factors of the conditions linked via the condition mask.
+        """
+        cls._row_sums = None
+        cls.calc_event_propensities(
+            cls.event_propensities_array.active,
+            Reaction.propensity_array.active[cls.reaction_index_array.active],
+            State.cell_mask_array.active,
+            Condition.cell_condition_factor_array.active,
+            cls.linked_conditions_array.active
+        )
+
+    @staticmethod
+    @njit(cache=True)
+    def calc_event_propensities(propensities, reaction_propensities, state_mask, factors, linked_conditions):
+        """
+        Fill the event propensity matrix row by row, so the state mask, condition factors and propensities
+        (all row-major) are walked contiguously in a single pass instead of per strided column.
+
+        :param propensities: Event propensity matrix (cells x events), written in place.
+        :param reaction_propensities: Reaction propensity of each event.
+        :param state_mask: Cell state mask (cells x events).
+        :param factors: Condition factors (cells x conditions).
+        :param linked_conditions: (event index, condition index) pairs of the event-condition mask.
+        """
+        for i in range(propensities.shape[0]):
+            for e in range(propensities.shape[1]):
+                propensities[i, e] = reaction_propensities[e] * state_mask[i, e]
+            for link in range(linked_conditions.shape[0]):
+                propensities[i, linked_conditions[link, 0]] *= factors[i, linked_conditions[link, 1]]
+
     @classmethod
     def get_total_propensity(cls):
         """
         Get the total sum propensity over the entire event propensity matrix.
+        Syncs the propensity tree with the event propensity matrix before reading its total.
 
         :return: total event propensity
         """
-        return cls.event_propensities_array.active.sum()
+        cls.update_propensity_tree()
+        return fenwick.total(cls._propensity_tree)
 
     @classmethod
-    def state_mask_correction(cls):
-        cls.event_propensities_array.arr *= State.cell_mask_array.arr
+    def update_propensity_tree(cls):
+        """
+        Push the changed cell-event propensities into the Fenwick tree.
+        Finding the changes still compares every entry, so a sync costs O(cells x events) like the propensity
+        update itself, only the changed entries (usually well under 1%) pay the O(log N) tree update.
+        The tree is rebuilt from scratch when the capacity of the event matrix changed
+        or after a fixed number of incremental updates.
+        """
+        propensities: np.ndarray = cls.event_propensities_array.active_flat
+        capacity: int = cls.event_propensities_array.arr.size
+
+        if cls._synced_propensities.size != capacity or cls._steps_since_rebuild >= cls.tree_rebuild_interval:
+            cls._synced_propensities = np.zeros(capacity)
+            cls._synced_propensities[:propensities.size] = propensities
+            cls._propensity_tree = fenwick.build(cls._synced_propensities)
+            cls._steps_since_rebuild = 0
+        else:
+            fenwick.apply_changes(cls._propensity_tree, cls._synced_propensities, propensities, cls._synced_size)
+            cls._steps_since_rebuild += 1
+
+        cls._synced_size = propensities.size
+
+    @classmethod
+    def get_row_sums(cls) -> np.ndarray:
+        """
+        Total propensity of every cell, computed once per propensity update and shared by all readers
+        (e.g. multiple reports made in the same step).
+        Cells added since the last propensity update invalidate the cache as well.
+
+        :return: Sum over the events of each cell.
+        """
+        if cls._row_sums is None or cls._row_sums.size != cls.event_propensities_array.row_size:
+            cls._row_sums = cls.event_propensities_array.active.sum(axis=1)
+        return cls._row_sums
 
     @classmethod
     def update_total_propensity(cls):
-        cls.total_propensity = cls.event_propensities_array.active.sum()
+        cls.total_propensity = cls.get_total_propensity()
 
     @classmethod
-    def random_cell_event_index(cls, total_propensity: float) -> tuple[int, int]:
+    def random_cell_event_index(cls, r: float) -> tuple[int, int]:
         """
         Picks a random event based on the propensity of an event of each cell.
 
-        Convert the propensity of each cell-event in the event matrix to a probability by dividing by total propensity.
-        The probability is in range 0 to 1, and the sum of all probabilities is equal to 1.
-        Flatten the matrix to an array and pick a random index via choice (choice handles the random value internally).
+        Descend the propensity tree (kept in sync by get_total_propensity) with a random value between 0 and the
+        total propensity to the first cell-event where the prefix sum of the flattened matrix exceeds it.
         Break the random flat index up into the cell index and event index via divmod.
 
         Via the cell index and the event index, the specific cell and event can be traced from their lists.
 
+        :param r: Random value between 0 and the total propensity.
         :return: A random cell index and event index weighted on their event propensity.
         """
-        r = np.random.uniform(0, total_propensity)
-        return divmod(cls.find_index(cls.event_propensities_array.active.ravel(), r), cls.total)
-
-    @staticmethod
-    @njit
-    def find_index(arr, r):
-        total = 0.0
-        for i in range(arr.size):
-            total += arr[i]
-            if r < total:
-                return i
-        return arr.size - 1
+        flat_index = min(fenwick.find(cls._propensity_tree, r), cls._synced_size - 1)
+        return divmod(flat_index, cls.total)
 
     @classmethod
     def print_event_matrix(cls):
@@ -128,7 +202,15 @@ class Event(InstanceTracker):
     @classmethod
     def reset_class(cls):
         super().reset_class()
-        cls.event_propensities_array = Dynamic2DArray()
+        cls.event_propensities_array = Dynamic2DArray(data_type=np.float32)
+        cls.reaction_index_array = DynamicArray(capacity=16, data_type=np.int64)
+        cls.event_condition_mask_array = Dynamic2DArray(data_type=np.bool_)
+        cls.linked_conditions_array = Dynamic2DArray(capacity_rows=16, capacity_columns=2, data_type=np.int64)
+        cls._propensity_tree = np.zeros(1)
+        cls._synced_propensities = np.zeros(0)
+        cls._synced_size = 0
+        cls._steps_since_rebuild = 0
+        cls._row_sums = None
         cls.total_propensity = 0
 
     @classmethod
@@ -0,0 +1,100 @@
+import numpy as np
+from numba import njit
+
+
+@njit("float64[::1](float64[::1])", cache=True)
+def build(values: np.ndarray) -> np.ndarray:
+    """
+    Build a binary indexed (Fenwick) tree over the given values in O(n).
+    The tree is 1-based, index 0 is unused.
+
+    :param values: Flat array of (non-negative) weights.
+    :return: Fenwick tree of size values.size + 1.
+    """
+    n = values.size
+    tree = np.zeros(n + 1, dtype=np.float64)
+    for i in range(1, n + 1):
+        tree[i] += values[i - 1]
+        parent = i + (i & -i)
+        if parent <= n:
+            tree[parent] += tree[i]
+    return tree
+
+
+@njit("void(float64[::1], int64, float64)", cache=True)
+def update(tree: np.ndarray, i: int, delta: float) -> None:
+    """
+    Add delta to the value at (0-based) index i.
+
+    :param tree: Fenwick tree.
+    :param i: Index of the changed value.
+    :param delta: Difference between the new and the old value.
+    """
+    n = tree.size - 1
+    j = i + 1
+    while j <= n:
+        tree[j] += delta
+        j += j & -j
+
+
+@njit("float64(float64[::1])", cache=True)
+def total(tree: np.ndarray) -> float:
+    """
+    Sum of all values stored in the tree.
+
+    :param tree: Fenwick tree.
+    :return: Total sum.
+    """
+    result = 0.0
+    j = tree.size - 1
+    while j > 0:
+        result += tree[j]
+        j -= j & -j
+    return result
+
+
+@njit("int64(float64[::1], float64)", cache=True)
+def find(tree: np.ndarray, r: float) -> int:
+    """
+    Descend the tree to find the first (0-based) index where the prefix sum exceeds r.
+
+    :param tree: Fenwick tree.
+    :param r: Random value between 0 and the total sum.
+    :return: Index of the value in which r lands.
+    """
+    n = tree.size - 1
+    step = 1
+    while step * 2 <= n:
+        step *= 2
+
+    pos = 0
+    while step > 0:
+        nxt = pos + step
+        if nxt <= n and tree[nxt] <= r:
+            pos = nxt
+            r -= tree[nxt]
+        step //= 2
+    return pos
+
+
+@njit("void(float64[::1], float64[::1], float32[::1], int64)", cache=True)
+def apply_changes(tree: np.ndarray, previous: np.ndarray, current: np.ndarray, previous_size: int) -> None:
+    """
+    Push the difference between the previously stored values and the current values into the tree.
+    Entries past the current size that were set before are cleared.
+
+    :param tree: Fenwick tree.
+    :param previous: Values the tree currently holds, updated in place to the current values.
+    :param current: New flat values (single precision, the tree itself stays double precision).
+    :param previous_size: Number of values that were synced during the last update.
+    """
+    for i in range(current.size):
+        delta = current[i] - previous[i]
+        if delta != 0.0:
+            update(tree, i, delta)
+            previous[i] = current[i]
+
+    for i in range(current.size, previous_size):
+        if previous[i] != 0.0:
+            update(tree, i, -previous[i])
+            previous[i] = 0.0
@@ -4,17 +4,26 @@ from src.utils.instance_tracker import InstanceTracker
 
 
 class State(InstanceTracker):
+    __slots__ = ("index", "name", "_event_mask_view")
     event_mask_array: Dynamic2DArray = Dynamic2DArray()     # States as rows and Events as columns
-    cell_mask_array: Dynamic2DArray = Dynamic2DArray()      # Cells as rows and States as columns
+    cell_mask_array: Dynamic2DArray = Dynamic2DArray(data_type=np.float32)      # Cells as rows and States as columns
 
     def __init__(self, name: str):
         super().__init__()
         self.name = name
         self.event_mask_array.append(0)
 
+        # Cache the row view on the backing array, refreshed when the array is reallocated
+        self._event_mask_view: np.ndarray = np.empty(0)
+        self.event_mask_array.on_resize(self._refresh_view)
+        self._refresh_view()
+
+    def _refresh_view(self):
+        self._event_mask_view = self.event_mask_array.view_row(self.index)
+
     @property
     def event_mask(self) -> np.ndarray:
-        return self.event_mask_array[self.index]
+        return self._event_mask_view
 
     def add_event_mask(self, event_indexes):
         self.event_mask_array[self.index, event_indexes] = np.float64(1)
@@ -23,7 +32,7 @@ class State(InstanceTracker):
     def reset_class(cls):
         super().reset_class()
         cls.event_mask_array = Dynamic2DArray()
-        cls.cell_mask_array = Dynamic2DArray()
+        cls.cell_mask_array = Dynamic2DArray(data_type=np.float32)
 
 
 if __name__ == '__main__':
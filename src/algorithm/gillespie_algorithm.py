@@ -19,6 +19,7 @@ class GillespieSimulator:
     Simulation ends when the end time is reached or when there are no events left.
     """
     benchmark = Timer()
+    random_batch_size: int = 4096   # Number of exponential and uniform draws sampled at once
 
     def __init__(self,
                  end_time: float,
@@ -26,7 +27,8 @@ class GillespieSimulator:
                  conditions: list[Condition], events: list[Event],
                  cells: list[Cell],
                  logger: SimulationLogger = None, reporter: ReportManager = None,
-                 plotter: ColonyPlotter = None, animator: CellGrowthAnimator = None):
+                 plotter: ColonyPlotter = None, animator: CellGrowthAnimator = None,
+                 seed: int = None):
         self.end_time: float = end_time
         self.reactions: list[Reaction] = reaction_channels
         self.conditions: list[Condition] = conditions
@@ -36,6 +38,10 @@ class GillespieSimulator:
         self.reporter: ReportManager = reporter
         self.plotter: ColonyPlotter = plotter
         self.animator: CellGrowthAnimator or None = animator
+        self.rng: np.random.Generator = np.random.default_rng(seed)     # PCG64 generator for the event and time draws
+        self._exp_buf: np.ndarray = np.empty(0)
+        self._uni_buf: np.ndarray = np.empty(0)
+        self._buf_idx: int = 0
 
         # Initialize parameters start of simulation
         self.total_propensity: float = 0
@@ -63,33 +69,72 @@ class GillespieSimulator:
             self._execute_event()
             self._log_data()
 
+    def run_fast(self):
+        """
+        Main loop of the Gillespie algorithm without the benchmark timers.
+        Same steps as run, but the propensity, time and event updates are inlined as direct calls
+        to the vectorized class methods to skip the per-step method dispatch.
+        """
+        print("[Start Gillespie algorithm]")
+        conditions = self.conditions
+        events = self.events
+        cells = self.cells
+        while self.run_time < self.end_time:
+            # Update propensities
+            Reaction.calc_all_propensities()
+            for condition in conditions:
+                condition.calc_factor()
+            Condition.clear_dirty_cells()
+            Event.update_all_propensities()
+            self.total_propensity = Event.get_total_propensity()
+
+            if self.total_propensity == 0:
+                self._end_of_simulation("No reactions left")
+                break
+
+            # Time increment and continuous factors
+            if self._buf_idx >= self._exp_buf.size:
+                self._refill_random_buffers()
+            self.tau = self._exp_buf[self._buf_idx] / self.total_propensity
+            self.run_time += self.tau
+            Cell.increase_age_over_time(self.tau)
+            Cell.increase_polarisome_over_time(self.tau)
+
+            if self.run_time >= self.end_time:
+                self._end_of_simulation("End time reached")
+                break
+
+            # Execute event
+            r = self._uni_buf[self._buf_idx] * self.total_propensity
+            self._buf_idx += 1
+            cell_index, event_index = Event.random_cell_event_index(r)
+            events[event_index].update(cells[cell_index])
+            self.total_events += 1
+
+            self._store_data()
+
     def _update_propensities(self):
         """Change and update all propensity related effects."""
         self._update_reaction_base_propensity()
         self._update_condition_factors()
         self._update_event_propensities()
-        self._apply_state_mask()
         self._update_total_propensity()
 
+    @staticmethod
     @benchmark.measure_decorator("reaction_base_propensity")
-    def _update_reaction_base_propensity(self):
-        for reaction in self.reactions:
-            reaction.calc_propensity()
+    def _update_reaction_base_propensity():
+        Reaction.calc_all_propensities()
 
     @benchmark.measure_decorator("condition_factors")
     def _update_condition_factors(self):
         for condition in self.conditions:
             condition.calc_factor()
-
-    @benchmark.measure_decorator("event_propensities")
-    def _update_event_propensities(self):
-        for event in self.events:
-            event.update_propensity()
+        Condition.clear_dirty_cells()
 
     @staticmethod
-    @benchmark.measure_decorator("state_mask")
-    def _apply_state_mask():
-        Event.state_mask_correction()
+    @benchmark.measure_decorator("event_propensities")
+    def _update_event_propensities():
+        Event.update_all_propensities()
 
     @benchmark.measure_decorator("total_propensity")
     def _update_total_propensity(self):
@@ -98,9 +143,19 @@ class GillespieSimulator:
     @benchmark.measure_decorator("time increase")
     def _update_time_increment(self):
         """Increase the time based on the systems total propensity."""
-        self.tau = np.random.exponential(1 / self.total_propensity)
+        if self._buf_idx >= self._exp_buf.size:
+            self._refill_random_buffers()
+
+        # A unit exponential scaled by the mean 1 / total propensity is an exact exponential draw
+        self.tau = self._exp_buf[self._buf_idx] / self.total_propensity
         self.run_time += self.tau
 
+    def _refill_random_buffers(self):
+        """Sample a new batch of unit exponential and uniform draws to consume one per step."""
+        self._exp_buf = self.rng.standard_exponential(self.random_batch_size)
+        self._uni_buf = self.rng.random(self.random_batch_size)
+        self._buf_idx = 0
+
     @benchmark.measure_decorator("time check")
     def _next_reaction_passes_end_time(self):
         return self.run_time >= self.end_time
@@ -114,14 +169,20 @@ class GillespieSimulator:
     @benchmark.measure_decorator("event execution")
     def _execute_event(self):
         """Pick a random weighted event and execute its action."""
-        cell_index, event_index = Event.random_cell_event_index(self.total_propensity)
+        r = self._uni_buf[self._buf_idx] * self.total_propensity
+        self._buf_idx += 1
+
+        cell_index, event_index = Event.random_cell_event_index(r)
         self.events[event_index].update(self.cells[cell_index])
         self.total_events += 1
 
     @benchmark.measure_decorator("log repeat_data")
     def _log_data(self):
+        self._store_data()
+
+    def _store_data(self):
         """Store repeat_data in logger, reporter and animator based on set configs."""
-        if self.logger:
+        if self.logger and self.run_time >= self.logger.next_log:
             self.logger.log(self.run_time)
 
         if self.reporter:
@@ -20,23 +20,31 @@ from src.utils.visual.animator import CellGrowthAnimator
 # ---------------
 # Main simulation initialize
 # ---------------
-def init() -> GillespieSimulator:
+def init(seed: int or np.random.SeedSequence = None) -> GillespieSimulator:
     """
     Simulation initializer based on the Config class.
     Specific relations of states, conditions and events are defined here.
 
+    :param seed: Seed of this simulation, defaults to run.SEED.
     :return GillespieSimulator: Simulation object that uses the Gillespie algorithm
     """
     # Create initial classes based on the configs
     reset_classes()     # In case there is some data remaining from a previouse repeat
     config = Config()   # Initialize central config class
+    simulator_seed = seed_random_state(config.run.SEED if seed is None else seed)
     elements, reactions, states, conditions, general_actions, event_actions, events = create_classes(config)
+    Reaction.build_stoichiometry_matrix()   # Collect the reactant coefficients for the vectorized propensities
 
     # Set the global partition size for the Colony SpatialHashing
     set_partition_size(config.cell.ERROR_TOLERANCE)
 
-    # Create spores
+    # Reserve the per-cell arrays up front to avoid repeated resizing during growth (at least room for all spores)
+    cell_capacity: int = max(config.run.INITIAL_CELL_CAPACITY, config.cell.SPORE_AMOUNT)
+    reserve_cell_capacity(cell_capacity)
+
+    # Create spores, the reserved cells are divided over their colonies
     initialize_spores(states)
+    reserve_colony_capacity(cell_capacity)
 
     # Create utils
     logger, reporter = create_analysis_tools(config)
@@ -51,12 +59,34 @@ def init() -> GillespieSimulator:
                                     logger=logger,
                                     reporter=reporter,
                                     plotter=plotter,
-                                    animator=animator
+                                    animator=animator,
+                                    seed=simulator_seed
                                     )
 
+    # Use the untimed main loop when benchmarking is disabled
+    if not config.run.BENCHMARK:
+        simulation.run = simulation.run_fast
+
     return simulation
 
 
+def seed_random_state(seed) -> np.random.SeedSequence or None:
+    """
+    Seed the global NumPy random state, which the cell actions and spore placement draw from,
+    and derive an independent seed for the generator of the simulator.
+
+    :param seed: Integer seed or SeedSequence, None leaves the global state untouched.
+    :return: Seed for the simulator generator, None when no seed is given.
+    """
+    if seed is None:
+        return None
+
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    global_seed, simulator_seed = seed_sequence.spawn(2)
+    np.random.seed(global_seed.generate_state(1)[0])
+    return simulator_seed
+
+
 def reset_classes():
     for project_class in [Element, Reaction, State, Condition, Event, Cell, Colony]:
         project_class.reset_class()
@@ -137,8 +167,8 @@ def create_classes(config):
     ce_ac.Action.state_mask = State.cell_mask_array
     ce_ac.Action.condition_factors = Condition.cell_condition_factor_array
 
-    ce_ac.CrowdingIndex.crowding_steepness = config.cell.CROWDING_SLOPE_STEEPNESS
-    ce_ac.CrowdingIndex.spacing = config.cell.CELL_SEGMENT_LENGTH
+    ce_ac.CrowdingIndex.set_crowding_parameters(config.cell.CROWDING_SLOPE_STEEPNESS,
+                                                config.cell.CELL_SEGMENT_LENGTH)
 
     ce_ac.GrowCell.cell_length = config.cell.CELL_SEGMENT_LENGTH
     ce_ac.GrowCell.angle_deviation = config.cell.NOISE_ANGLE_DEVIATION
@@ -277,10 +307,23 @@ def create_classes(config):
 
 def set_partition_size(error_tolerance):
     partition_size = ce_ac.CrowdingIndex.calculate_query_size(error_tolerance)
-    SpatialHashing.partition_size = partition_size
+    SpatialHashing.set_partition_size(partition_size)
     print("[Partition size]", partition_size)
 
 
+def reserve_cell_capacity(capacity: int):
+    for cell_array in [Cell.center_point_array, Cell.end_point_array, Cell.age_array, Cell.crowding_index_array,
+                       Cell.DivIVA_array, Cell.colony_index_array,
+                       Cell.parent_index_array, Cell.state_index_array, Cell.direction_array, Cell.length_array,
+                       State.cell_mask_array, Condition.cell_condition_factor_array, Event.event_propensities_array]:
+        cell_array.reserve(capacity)
+
+
+def reserve_colony_capacity(capacity: int):
+    for colony in Colony.instances:
+        colony.reserve(capacity // Colony.total)
+
+
 def initialize_spores(states):
     for i in range(Config().cell.SPORE_AMOUNT):
         # Create spore cell
@@ -294,5 +337,5 @@ def initialize_spores(states):
 
         # Add base values for the root cell
         State.cell_mask_array.append(new_root.state.event_mask)
-        Condition.cell_condition_factor_array.append(0)
+        Condition.cell_condition_factor_array.append()
         Event.event_propensities_array.append(0)
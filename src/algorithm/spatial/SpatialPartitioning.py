@@ -2,18 +2,24 @@ import warnings
 import numpy as np
 from itertools import product
 
-from src.utils import DynamicArray
 from src.algorithm.cell_based.cell import Cell
 
 
 class SpacePartition:
     """
-    SpacePartition holds inserted cells based on their cell center point.
+    SpacePartition holds cells based on their cell center point.
     The maximum point within the space is 0 <= (x and y) < space size.
+
+    The cell indexes of all partitions are stored in one flat buffer sorted on partition (CSR layout),
+    where partition p holds partition_indices[partition_offsets[p]:partition_offsets[p] + partition_counts[p]].
+    The slots up to partition_offsets[p + 1] are slack, so single inserts don't have to shift the whole buffer.
     """
+    min_partition_capacity: int = 8     # Slots a full partition grows to at least when a cell is inserted
     def __init__(self, space_size, query_size):
         self.size = space_size
+        self._inv_size = 1.0 / space_size     # Used for the branchless periodic wrap of coordinate differences
         self.searching_distance = query_size
+        self.searching_distance_sq = query_size * query_size   # Compare squared distances, skips the sqrt
 
         # How many partitions are made in the square sized space
         self.number_of_partitions = int(space_size / query_size)
@@ -24,32 +30,93 @@ class SpacePartition:
 
         # The exact length of a partition
         self.partition_modulo = space_size / self.number_of_partitions
+        self.inv_mod = 1.0 / self.partition_modulo     # Multiply instead of divide when converting points
+
+        # Create an empty CSR grid based on the given settings
+        self.partition_indices: np.ndarray = np.empty(0, dtype=np.int32)
+        self.partition_offsets: np.ndarray = np.zeros(self.number_of_partitions ** 2 + 1, dtype=np.int32)
+        self.partition_counts: np.ndarray = np.zeros(self.number_of_partitions ** 2, dtype=np.int32)
 
-        # Create grid based on the given settings
-        self.cell_grid = [[DynamicArray(data_type=np.int64)
-                           for x_partition in range(self.number_of_partitions)]
-                          for y_partition in range(self.number_of_partitions)]
+        self.offsets = list(product([-1, 0, 1], repeat=2))
 
-        self.offsets = np.array(list(product([-1, 0, 1], repeat=2))) if self.number_of_partitions != 1 else 0
+        # A single partition holds every cell, so skip the 3 x 3 lookup altogether
+        if self.number_of_partitions == 1:
+            self.query = self._query_single
+        else:
+            self.query = self._query_grid
 
     def point_to_partition_index(self, point):
         """
         Convert the given point to the corresponding partition index.
 
-        :param point: Input point that gets translated to corresponding partition index.
+        Points are within [0, space size), so the int cast equals the floor division.
+
+        :param point: Input 1D (x, y) point that gets translated to corresponding partition index.
         :return: (x partition index, y partition index)
         """
-        return (point // self.partition_modulo).astype(np.int64)
+        return int(point[0] * self.inv_mod), int(point[1] * self.inv_mod)
 
     def insert(self, cell: Cell):
         """
         Insert a cell based on it's center point in the corresponding partition.
+        The cell goes in the slack of its partition, only a full partition makes the buffer grow.
 
         :param cell: Input cell that gets stored inside the grid.
         """
-        partition_index = self.point_to_partition_index(cell.center)
+        ix, iy = self.point_to_partition_index(cell.center)
+        partition = iy * self.number_of_partitions + ix
+
+        end = self.partition_offsets[partition] + self.partition_counts[partition]
+        if end == self.partition_offsets[partition + 1]:
+            self._grow_partition(partition)
+            end = self.partition_offsets[partition] + self.partition_counts[partition]
+
+        self.partition_indices[end] = cell.index
+        self.partition_counts[partition] += 1
+
+    def _grow_partition(self, partition: int):
+        """
+        Double the slots of a full partition, the other partitions keep their slots.
+        Every partition can only double a logarithmic number of times, so the copies stay amortized.
+
+        :param partition: Flat index of the full partition.
+        """
+        capacities = np.diff(self.partition_offsets)
+        capacities[partition] = max(2 * capacities[partition], self.min_partition_capacity)
+        new_offsets = np.zeros_like(self.partition_offsets)
+        np.cumsum(capacities, out=new_offsets[1:])
+
+        # Copy the used slots of every partition to the start of its new slots
+        counts = self.partition_counts
+        rank = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        new_indices = np.empty(new_offsets[-1], dtype=np.int32)
+        new_indices[np.repeat(new_offsets[:-1], counts) + rank] = \
+            self.partition_indices[np.repeat(self.partition_offsets[:-1], counts) + rank]
+
+        self.partition_indices = new_indices
+        self.partition_offsets = new_offsets
+
+    def rebuild_from_centers(self, centers: np.ndarray, cell_indexes: np.ndarray = None):
+        """
+        Rebuild the whole grid from the given center points with a counting sort on partition,
+        meant to be called once per step instead of inserting cell by cell.
+
+        :param centers: Center points, one (x, y) per row.
+        :param cell_indexes: Cell index of each center point, defaults to the row number.
+        """
+        n = self.number_of_partitions
+        if cell_indexes is None:
+            cell_indexes = np.arange(centers.shape[0], dtype=np.int32)
+
+        partition_index = (centers * self.inv_mod).astype(np.int32)
+        flat_partition = partition_index[:, 1] * n + partition_index[:, 0]
+
+        self.partition_counts = np.bincount(flat_partition, minlength=n * n).astype(np.int32)
+        self.partition_offsets[0] = 0
+        np.cumsum(self.partition_counts, out=self.partition_offsets[1:])
 
-        self.cell_grid[partition_index[1]][partition_index[0]].append(cell.index)
+        order = np.argsort(flat_partition, kind="stable")
+        self.partition_indices = np.asarray(cell_indexes, dtype=np.int32)[order]
 
     def wrap(self, point):
         """
@@ -60,19 +127,29 @@ class SpacePartition:
         """
         return (point[0] + self.size) % self.size, (point[1] + self.size) % self.size
 
-    def query(self, point):
+    def _query_single(self, point):
+        """
+        Get all cells, used when the whole space is a single partition.
+
+        :param point: Input target point (unused).
+        :return: All cell indexes in the space.
+        """
+        return self.partition_indices[:self.partition_counts[0]]
+
+    def _query_grid(self, point):
         """
         Get all cells of all neighbouring 3 x 3 partitions.
-        [broken]
 
         :param point: Input target point.
-        :return:
+        :return: All cell indexes in neighbouring partitions.
         """
-        partition_index = self.point_to_partition_index(point)
-        neighbor_partition_indices = (partition_index + self.offsets) % self.number_of_partitions
-        neighbors = [self.cell_grid[y][x].active
-                     for x, y in zip(neighbor_partition_indices[:, 0],
-                                     neighbor_partition_indices[:, 1])]
+        ix, iy = self.point_to_partition_index(point)
+        n = self.number_of_partitions
+        neighbors = []
+        for dx, dy in self.offsets:
+            partition = ((iy + dy) % n) * n + (ix + dx) % n
+            start = self.partition_offsets[partition]
+            neighbors.append(self.partition_indices[start:start + self.partition_counts[partition]])
 
         return np.concatenate(neighbors)
 
@@ -92,28 +169,37 @@ class SpacePartition:
     def calc_distances(self, neighbour_positions, target):
         """
         Calculates all the distances of given neighbours points based on the input target point.
+        The space wraps around (like the query), so the shortest distance over the borders is used.
 
         :param neighbour_positions: Collection of neighbouring cell points, used for distance calculation.
         :param target: Point where all neighbouring points are used for distance calculation.
         :return: All distances of neighbouring cells relative to the target point.
         """
-        # # Get the absolute difference of x and y based on the given target
-        # absolute_difference = abs(neighbour_positions - target)
-        #
-        # # Get the smallest difference of the wrapped space
-        # delta_difference = np.minimum(absolute_difference, self.size - absolute_difference)
-
-        # Calculate distance on formatted points
-        dists = np.linalg.norm(neighbour_positions - target, axis=1)
-
-        return dists
+        return np.sqrt(self.calc_distances_sq(neighbour_positions, target))
 
     def filter_distances(self, distances):
         return distances[distances < self.searching_distance]
 
+    def calc_distances_sq(self, neighbour_positions, target):
+        """
+        Calculates the squared distances of given neighbours points to the target point (no square root).
+        Differences are wrapped to the nearest periodic image in one pass: d - size * round(d / size).
+
+        :param neighbour_positions: Collection of neighbouring cell points, used for distance calculation.
+        :param target: Point where all neighbouring points are used for distance calculation.
+        :return: All squared distances of neighbouring cells relative to the target point.
+        """
+        diff = neighbour_positions - target
+        diff -= self.size * np.rint(diff * self._inv_size)
+        return np.einsum("ij,ij->i", diff, diff)
+
+    def filter_distances_sq(self, distances_sq):
+        return distances_sq[distances_sq < self.searching_distance_sq]
+
     def print_partition_sizes(self):
-        for row in self.cell_grid:
-            print("\t".join(str(len(partition)) for partition in row))
+        sizes = self.partition_counts.reshape(self.number_of_partitions, self.number_of_partitions)
+        for row in sizes:
+            print("\t".join(str(size) for size in row))
 
     @property
     def center(self):
@@ -121,20 +207,20 @@ class SpacePartition:
 
 
 if __name__ == '__main__':
-    from src.utils import Timer
+    from src.utils.benchmark_timer import Timer
 
     timer = Timer()
     space = SpacePartition(100, 10)
 
     for i in range(10_000):
         with timer.measure("generate random point"):
-            r_point = space.get_random_point()
+            r_point = space.get_random_point()[0]
 
         with timer.measure("create new cell"):
-            new_cell = Cell(r_point, r_point)
+            new_cell = Cell(r_point, r_point, 0)
 
-        with timer.measure("cell insertion"):
-            space.insert(new_cell)
+    with timer.measure("grid rebuild"):
+        space.rebuild_from_centers(Cell.center_point_array.active)
 
     space.print_partition_sizes()
     timer.print_times()
@@ -143,7 +229,7 @@ if __name__ == '__main__':
 
     for i in range(1_000):
         with timer_2.measure("generate random point"):
-            r_point = space.get_random_point()
+            r_point = space.get_random_point()[0]
 
         with timer_2.measure("query"):
             neighbours = space.query(r_point)
@@ -152,14 +238,14 @@ if __name__ == '__main__':
             neighbour_points = Cell.center_point_array[neighbours]
 
         with timer_2.measure("distance calc query"):
-            query_dists = space.calc_distances(neighbour_points, r_point)
+            query_dists = space.calc_distances_sq(neighbour_points, r_point)
 
         with timer_2.measure("distance calc all"):
-            all_dists = space.calc_distances(space.get_all_points(), r_point)
+            all_dists = space.calc_distances_sq(space.get_all_points(), r_point)
 
         with timer_2.measure("distance filter sum check"):
-            query_sum = space.filter_distances(query_dists).sum()
-            all_sum = space.filter_distances(all_dists).sum()
+            query_sum = space.filter_distances_sq(query_dists).sum()
+            all_sum = space.filter_distances_sq(all_dists).sum()
             if np.isclose(query_sum, all_sum):
                 # The values are significantly the same
                 pass
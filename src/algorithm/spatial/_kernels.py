@@ -0,0 +1,80 @@
+import math
+import numpy as np
+from numba import njit
+
+
+@njit("int64(float64[:, ::1], float64[::1], int32[::1], float64, int32[::1], float64[:, ::1], float64[::1])",
+      cache=True)
+def filter_by_radius(centers: np.ndarray,
+                     target: np.ndarray,
+                     candidates: np.ndarray,
+                     max_dist: float,
+                     out_indexes: np.ndarray,
+                     out_points: np.ndarray,
+                     out_distances: np.ndarray) -> int:
+    """
+    Walk the candidate indexes once and write the ones within max_dist of the target into preallocated buffers.
+    Points are read directly from the full center point array, so the candidates don't need to be gathered first.
+
+    :param centers: Center points of all cells, one (x, y) per row.
+    :param target: 2D coordinates of the target point.
+    :param candidates: Indexes of the potential neighbours.
+    :param max_dist: Exclude a candidate if its distance is greater than the max.
+    :param out_indexes: Buffer for the valid indexes, at least the size of the candidates.
+    :param out_points: Buffer for the valid points, at least the size of the candidates.
+    :param out_distances: Buffer for the valid distances, at least the size of the candidates.
+    :return: Number of valid neighbours written to the start of the buffers.
+    """
+    tx, ty = target[0], target[1]
+    max_sq_dist = max_dist * max_dist
+
+    count = 0
+    for i in range(candidates.shape[0]):
+        ind = candidates[i]
+        dx = centers[ind, 0] - tx
+        dy = centers[ind, 1] - ty
+        dist_squared = dx * dx + dy * dy
+        if dist_squared <= max_sq_dist:
+            out_indexes[count] = ind
+            out_points[count, 0] = centers[ind, 0]
+            out_points[count, 1] = centers[ind, 1]
+            out_distances[count] = math.sqrt(dist_squared)
+            count += 1
+    return count
+
+
+@njit("float64(float64[:, ::1], int64, int64, int64)", cache=True)
+def _cross(points: np.ndarray, o: int, a: int, b: int) -> float:
+    """Z component of the cross product of o->a and o->b, positive for a counter-clockwise turn."""
+    return ((points[a, 0] - points[o, 0]) * (points[b, 1] - points[o, 1])
+            - (points[a, 1] - points[o, 1]) * (points[b, 0] - points[o, 0]))
+
+
+@njit("int64[::1](float64[:, ::1])", cache=True)
+def monotone_chain(sorted_points: np.ndarray) -> np.ndarray:
+    """
+    Andrew's monotone chain convex hull, without the fixed setup cost of QHull for small point sets.
+
+    :param sorted_points: Points sorted on x and then on y, one (x, y) per row (at least 3 rows).
+    :return: Row indexes of the hull vertices in counter-clockwise order (collinear points are left out).
+    """
+    n = sorted_points.shape[0]
+    hull = np.empty(2 * n, dtype=np.int64)
+    k = 0
+
+    # Lower hull, from left to right
+    for i in range(n):
+        while k >= 2 and _cross(sorted_points, hull[k - 2], hull[k - 1], i) <= 0:
+            k -= 1
+        hull[k] = i
+        k += 1
+
+    # Upper hull, from right to left
+    lower_size = k + 1
+    for i in range(n - 2, -1, -1):
+        while k >= lower_size and _cross(sorted_points, hull[k - 2], hull[k - 1], i) <= 0:
+            k -= 1
+        hull[k] = i
+        k += 1
+
+    return hull[:k - 1]     # The last point is the first point again
@@ -1,3 +1,4 @@
+import math
 import numpy as np
 from src.algorithm.cell_based.cell import Cell
 
@@ -72,10 +73,23 @@ from src.utils.dynamic_array import DynamicArray
 
 class SpatialHashing:
     partition_size: float = 0
-    neighbour_offsets = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)], np.int32)
+    _inv_partition_size: float = 0  # Reciprocal of the partition size, keys are computed with a multiply
+    KEY_SHIFT: int = 32     # A partition (x, y) is stored as the single int key (x << KEY_SHIFT) + y
+    neighbour_key_deltas = tuple((dx << 32) + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1))    # Shift of KEY_SHIFT
+    bucket_capacity: int = 16   # Initial capacity of a partition, grows when needed
 
     def __init__(self):
-        self.grid: dict[tuple[int, int], DynamicArray] = {}
+        self.grid: dict[int, DynamicArray] = {}
+
+    @classmethod
+    def set_partition_size(cls, partition_size: float) -> None:
+        """
+        Set the partition size shared by all grids.
+
+        :param partition_size: Width and height of a single partition.
+        """
+        cls.partition_size = partition_size
+        cls._inv_partition_size = 1.0 / partition_size
 
     def insert(self, cell: Cell) -> None:
         """
@@ -86,13 +100,56 @@ class SpatialHashing:
 
         :param cell: Cell to insert
         """
-        cell_key: tuple[int, int] = self.get_cell_key(cell.center)
-        self.grid.setdefault(cell_key, DynamicArray(data_type=np.int32)).append(cell.index)
+        cell_key: int = self.get_cell_key(cell.center)
+        cell.grid_key = cell_key    # Remember the key, so queries around the cell can skip the conversion
+
+        # Only create a new partition on a miss (setdefault would build one on every call)
+        bucket = self.grid.get(cell_key)
+        if bucket is None:
+            bucket = self.grid[cell_key] = DynamicArray(self.bucket_capacity, np.int32)
+        bucket.append(cell.index)
+
+    def bulk_insert(self, centers: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """
+        Insert multiple cell indexes into the colony grid at once.
+
+        1. Convert all coördinates into partition keys in one pass
+        2. Sort the indexes on key, so every partition gets one contiguous run of indexes
+        3. Extend each partition with its run (create a new array if key doesn't excist)
+
+        :param centers: Center points of the cells, one (x, y) per row.
+        :param indices: Cell indexes coupled with the center points.
+        :return: Partition key of each inserted index.
+        """
+        if len(indices) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        keys: np.ndarray = self.get_cell_keys(centers)
+        order: np.ndarray = np.argsort(keys, kind="stable")
+        sorted_keys: np.ndarray = keys[order]
+        _, run_starts = np.unique(sorted_keys, return_index=True)
+        run_ends = np.append(run_starts[1:], order.size)
 
-    def get_cell_key(self, point: tuple[float, float]) -> tuple[int, int]:
-        """Convert coordinates to partition index."""
+        sorted_indices: np.ndarray = np.asarray(indices, dtype=np.int32)[order]
+        for start, end in zip(run_starts, run_ends):
+            cell_key = int(sorted_keys[start])
+            bucket = self.grid.get(cell_key)
+            if bucket is None:
+                bucket = self.grid[cell_key] = DynamicArray(self.bucket_capacity, np.int32)
+            bucket.extend(sorted_indices[start:end])
+
+        return keys
+
+    def get_cell_key(self, point: tuple[float, float]) -> int:
+        """Convert coordinates to a single int partition key."""
         x, y = point
-        return int(x // self.partition_size), int(y // self.partition_size)
+        inv_size = self._inv_partition_size
+        return (math.floor(x * inv_size) << self.KEY_SHIFT) + math.floor(y * inv_size)
+
+    def get_cell_keys(self, points: np.ndarray) -> np.ndarray:
+        """Convert an array of coordinates to int partition keys, one key per row."""
+        partitions: np.ndarray = np.floor(points * self._inv_partition_size).astype(np.int64)
+        return (partitions[:, 0] << self.KEY_SHIFT) + partitions[:, 1]
 
     def query(self, point: tuple[float, float]) -> np.ndarray:
         """
@@ -102,11 +159,30 @@ class SpatialHashing:
         :param point: Coördinate used for 3x3 grid lookup.
         :return: All cell indexes in neighbouring partitions.
         """
-        x_key, y_key = self.get_cell_key(point)
-        return np.concatenate(
-            [
-                self.grid[neighbour_cell].active
-                for dx, dy in self.neighbour_offsets
-                if (neighbour_cell := (x_key + dx, y_key + dy)) in self.grid
-            ]
-        )
+        return self.query_by_key(self.get_cell_key(point))
+
+    def query_by_key(self, cell_key: int) -> np.ndarray:
+        """
+        Find all the cell indexes located within a 3x3 grid of partitions
+        surrounding the given partition key (e.g. the key stored on a cell at insertion).
+
+        :param cell_key: Partition key used for 3x3 grid lookup.
+        :return: All cell indexes in neighbouring partitions.
+        """
+        # Collect the occupied partitions and their total size
+        buckets: list[np.ndarray] = []
+        total: int = 0
+        for key_delta in self.neighbour_key_deltas:
+            bucket = self.grid.get(cell_key + key_delta)
+            if bucket is not None:
+                indexes = bucket.active
+                buckets.append(indexes)
+                total += indexes.shape[0]
+
+        # Copy all partitions into one preallocated output
+        neighbours: np.ndarray = np.empty(total, dtype=np.int32)
+        pos: int = 0
+        for indexes in buckets:
+            neighbours[pos:pos + indexes.shape[0]] = indexes
+            pos += indexes.shape[0]
+        return neighbours
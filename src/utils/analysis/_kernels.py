@@ -0,0 +1,61 @@
+import math
+import numpy as np
+from numba import njit
+
+
+@njit("UniTuple(float64, 2)(float64[:, ::1], float64[:, ::1])", cache=True, fastmath=True)
+def principal_spans(points: np.ndarray, projected: np.ndarray) -> tuple[float, float]:
+    """
+    Project the points on their two principal axes and measure the span along each axis, in two passes.
+    The first pass collects the mean and the 2x2 scatter matrix, whose eigenvectors are solved in closed form.
+    The second pass projects the points and tracks the minimum and maximum per axis.
+
+    :param points: Points, one (x, y) per row (at least one row).
+    :param projected: Buffer of the same shape, filled with the centered points in the principal axes frame
+                      (the axis with the largest variance first).
+    :return: Span along the first and the second principal axis.
+    """
+    n = points.shape[0]
+
+    # Mean
+    mx, my = 0.0, 0.0
+    for i in range(n):
+        mx += points[i, 0]
+        my += points[i, 1]
+    mx /= n
+    my /= n
+
+    # Scatter matrix [[a, b], [b, d]]
+    a, b, d = 0.0, 0.0, 0.0
+    for i in range(n):
+        dx = points[i, 0] - mx
+        dy = points[i, 1] - my
+        a += dx * dx
+        b += dx * dy
+        d += dy * dy
+
+    # Eigenvector of the largest eigenvalue, the second axis is perpendicular
+    if b != 0.0:
+        largest_eigenvalue = 0.5 * (a + d) + math.hypot(0.5 * (a - d), b)
+        ux, uy = largest_eigenvalue - d, b
+        norm = math.hypot(ux, uy)
+        ux /= norm
+        uy /= norm
+    elif a >= d:
+        ux, uy = 1.0, 0.0
+    else:
+        ux, uy = 0.0, 1.0
+
+    # Project and track the spans
+    min_1, max_1, min_2, max_2 = np.inf, -np.inf, np.inf, -np.inf
+    for i in range(n):
+        dx = points[i, 0] - mx
+        dy = points[i, 1] - my
+        p1 = dx * ux + dy * uy
+        p2 = dy * ux - dx * uy
+        projected[i, 0] = p1
+        projected[i, 1] = p2
+        min_1, max_1 = min(min_1, p1), max(max_1, p1)
+        min_2, max_2 = min(min_2, p2), max(max_2, p2)
+
+    return max_1 - min_1, max_2 - min_2
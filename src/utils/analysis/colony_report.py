@@ -1,6 +1,4 @@
 import numpy as np
-from scipy.spatial import ConvexHull
-from scipy.spatial.distance import cdist
 from pathlib import Path
 import json
 from src.utils.load_config import Config
@@ -9,6 +7,7 @@ from src.utils.visual.colony_analysis_plotter import CAVisualize
 from src.algorithm.cell_based.colony import Colony
 from src.algorithm.cell_based.cell import Cell
 from src.algorithm.event.event import Event
+from src.utils.analysis._kernels import principal_spans
 
 
 class ColonyAnalysisReport(CAVisualize, InstanceTracker):
@@ -56,27 +55,75 @@ class ColonyAnalysisReport(CAVisualize, InstanceTracker):
         self.average_crowding: list[np.float64] = []
         self.crowd_distr: list[np.ndarray] = []
 
+        # Metrics derived from the stats above, calculated once at the end of the analysis
+        self.total_length: np.ndarray = np.empty(0)
+        self.hyphal_density: np.ndarray = np.empty(0)
+        self.log10_area: np.ndarray = np.empty(0)
+        self.tip_density: np.ndarray = np.empty(0)
+
         self.simulator = None
 
     def run_analysis(self):
+        self.fill_cell_data()
         for colony in self.colonies:
             self.fill_data(colony)
+        self.calc_metrics()
+
+    def calc_metrics(self):
+        """Calculate the derived metrics of all colonies at once, shared by the json and formatted report."""
+        area = np.asarray(self.area, dtype=np.float64)
+        has_area = area > 0
+        safe_area = np.where(has_area, area, 1.0)
+
+        self.total_length = np.asarray(self.number_of_cells, dtype=np.int64) * Config().cell.CELL_SEGMENT_LENGTH
+        self.hyphal_density = np.where(has_area, self.total_length / safe_area, 0)
+        self.log10_area = np.where(has_area, np.log10(safe_area), 1e-6)
+        self.tip_density = np.asarray(self.num_active_cells) / self.total_length
+
+    def fill_cell_data(self):
+        """
+        Fill the cell stats of all colonies in one pass over the cell arrays.
+        Cells are grouped per colony with a single sort, the counts and averages are aggregated with bincount.
+        """
+        n_colonies: int = Colony.total
+        cell_colony: np.ndarray = Cell.colony_index_array.active
+        order: np.ndarray = np.argsort(cell_colony, kind="stable")
+        order = order[cell_colony[order] >= 0]     # Skip cells without a colony
+        sorted_colony: np.ndarray = cell_colony[order]
+        bounds: np.ndarray = np.searchsorted(sorted_colony, np.arange(n_colonies + 1))
+
+        sorted_props: np.ndarray = Event.get_row_sums()[order]
+        sorted_crowding: np.ndarray = Cell.crowding_index_array.active[order]
+        active_mask: np.ndarray = sorted_props > 0
+
+        num_cells = np.bincount(sorted_colony, minlength=n_colonies)
+        num_active = np.bincount(sorted_colony, weights=active_mask, minlength=n_colonies)
+        sum_props = np.bincount(sorted_colony, weights=np.where(active_mask, sorted_props, 0), minlength=n_colonies)
+        sum_crowding = np.bincount(sorted_colony, weights=sorted_crowding, minlength=n_colonies)
+        average_props = np.divide(sum_props, num_active, out=np.full(n_colonies, np.nan), where=num_active > 0)
+        average_crowding = np.divide(sum_crowding, num_cells, out=np.full(n_colonies, np.nan), where=num_cells > 0)
+
+        filled = num_cells > 0
+        max_crowding = np.full(n_colonies, np.nan)
+        if filled.any():
+            max_crowding[filled] = np.maximum.reduceat(sorted_crowding, bounds[:-1][filled])
 
-    def fill_data(self, colony: Colony):
-        # Cell stats
-        self.number_of_cells.append(colony.cell_count)
-        act_cells, props, crowding = self.cell_data_distribution(colony)
-        self.num_active_cells.append(act_cells)
-        self.average_propensity.append(np.average(props))
-        self.propensity_distr.append(props)
-        self.max_crowding.append(max(crowding))
-        self.average_crowding.append(np.average(crowding))
-        self.crowd_distr.append(crowding)
+        for colony in self.colonies:
+            i = colony.index
+            start, end = bounds[i], bounds[i + 1]
+            self.number_of_cells.append(int(num_cells[i]))
+            self.num_active_cells.append(int(num_active[i]))
+            self.average_propensity.append(average_props[i])
+            self.propensity_distr.append(sorted_props[start:end][active_mask[start:end]])
+            self.max_crowding.append(max_crowding[i])
+            self.average_crowding.append(average_crowding[i])
+            self.crowd_distr.append(sorted_crowding[start:end])
 
+    def fill_data(self, colony: Colony):
         # Morphology repeat_data
         points = colony.cell_points
         # area, min_dim, max_dim = self.calc_hull(points)
-        self.area.append(self.calc_area(points))
+        self.area.append(self.calc_area(colony.update_hull()))     # The hull vertices give the same area
         min_dim, max_dim, projected = self.calc_diameter(points)
         # self.area.append(area)
         self.min_diameter.append(min_dim)
@@ -85,12 +132,13 @@ class ColonyAnalysisReport(CAVisualize, InstanceTracker):
 
     @staticmethod
     def calc_area(points: np.ndarray):
-        if len(points) < 3:
+        hull = Colony.convex_hull_vertices(points)
+        if len(hull) < 3:
             return 0
 
-        hull = ConvexHull(points)
-        area = hull.volume  # 2D volume = area
-        return area
+        # Shoelace formula over the counter-clockwise hull vertices
+        x, y = hull[:, 0], hull[:, 1]
+        return 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
 
     @staticmethod
     def minimal_distance(hull):
@@ -105,117 +153,109 @@ class ColonyAnalysisReport(CAVisualize, InstanceTracker):
 
     @staticmethod
     def maximum_distance(hull):
+        """
+        Diameter of the convex hull with rotating calipers, O(V) instead of the O(V^2) pairwise distance matrix.
+        In 2D QHull gives the hull vertices in counter-clockwise order.
+        """
         points = hull.points[hull.vertices]
-        pairwise_distances = cdist(points, points)
-        return np.max(pairwise_distances)
+        n = len(points)
+
+        def area2(a, b, c):
+            """Twice the signed area of triangle abc, the distance of c to the line ab (scaled)."""
+            return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+        max_sq_dist = 0.0
+        j = 1
+        for i in range(n):
+            p_i, p_next = points[i], points[(i + 1) % n]
+            # Advance the opposite point while it gets further away from edge i
+            while area2(p_i, p_next, points[(j + 1) % n]) > area2(p_i, p_next, points[j]):
+                j = (j + 1) % n
+            for p in (p_i, p_next):
+                diff = p - points[j]
+                max_sq_dist = max(max_sq_dist, diff[0] * diff[0] + diff[1] * diff[1])
+        return np.sqrt(max_sq_dist)
 
     @staticmethod
     def calc_diameter(points: np.ndarray) -> (float, float, np.ndarray):
         if len(points) < 3:
             return 0, 0, points
 
-        center = points.mean(axis=0)
-        centered_points = points - center
-
-        U, S, Vt = np.linalg.svd(centered_points, full_matrices=False)
-        components = Vt.T
-
-        projected = centered_points @ components
-        PC1 = projected[:, 0]
-        PC2 = projected[:, 1]
-
-        PC1_span = max(PC1) - min(PC1)
-        PC2_span = max(PC2) - min(PC2)
+        points = np.ascontiguousarray(points, dtype=np.float64)
+        projected = np.empty_like(points)
+        PC1_span, PC2_span = principal_spans(points, projected)
 
         return min(PC1_span, PC2_span), max(PC1_span, PC2_span), projected
 
-    @staticmethod
-    def cell_data_distribution(colony: Colony) -> tuple[int, np.ndarray, np.ndarray]:
-        cell_inds = colony.cell_indexes
-        cell_propensities: np.ndarray = Event.event_propensities_array[cell_inds, :].sum(axis=1)
-        cell_active_mask: np.ndarray = cell_propensities > 0
-        cell_props_filt: np.ndarray = cell_propensities[cell_active_mask]
-        active_cells: int = cell_props_filt.size
-        crowding: np.ndarray = Cell.crowding_index_array[cell_inds]
-        return active_cells, cell_props_filt, crowding
-
     def save_as_formatted_report(self, run_file_path, time_point):
+        with open(run_file_path, 'a') as file:
+            self.write_formatted_report(file, time_point)
+
+    def write_formatted_report(self, file, time_point):
+        """
+        Write the report in the readable text format to an already opened file.
+
+        :param file: Opened (text mode) file.
+        :param time_point: Time point of the report.
+        """
         text_lines = [f"=[Report: {self.index}]=",
                       self.format_line("Time point", [time_point])]
         for param_name in self.report_params:
             param_values = getattr(self, param_name)
             text_lines.append(self.format_line(param_name, param_values))
 
-        total_length = [value * Config().cell.CELL_SEGMENT_LENGTH for value in self.number_of_cells]
-        text_lines.append(self.format_line('total_lengt', total_length))
-        density = [
-            length / area
-            if area > 0
-            else 0
-            for length, area in zip(total_length, self.area)
-        ]
-        text_lines.append(self.format_line('density', density))
-        single_string_report = "\n".join(text_lines) + "\n\n"
-        with open(run_file_path, 'a') as file:
-            file.write(single_string_report)
+        text_lines.append(self.format_line('total_lengt', self.total_length))
+        text_lines.append(self.format_line('density', self.hyphal_density))
+        file.write("\n".join(text_lines) + "\n\n")
 
     def save_as_json(self, repeat_file_path: Path, time_point: float):
+        # Append repeat_data to the run file
+        with open(repeat_file_path.with_suffix(".jsonl"), 'a') as jfile:
+            self.write_json(jfile, time_point)
+
+    def write_json(self, jfile, time_point: float):
+        """
+        Write the report as a single json line to an already opened file.
+
+        :param jfile: Opened (text mode) file.
+        :param time_point: Time point of the report.
+        """
         # Calculated metrics parameters
         metric_parameters = self.get_metric_values()
 
-        # Report repeat_data in json format
+        # Report repeat_data in json format, numpy values are converted per parameter in one tolist() call
         parameters: dict = {
             param_name: getattr(self, param_name)
             for param_name in self.report_params
         }
         parameters.update(metric_parameters)
+        parameters = {
+            param_name: np.asarray(values).tolist()
+            for param_name, values in parameters.items()
+        }
 
         report_json = {
             "Report_ID": self.index,
-            "Time_Point": time_point,
+            "Time_Point": float(time_point),
             "Parameters": parameters
         }
 
-        # Convert repeat_data to json datatypes
-        def json_serializer(obj):
-            """Handle non-JSON types automatically"""
-            if isinstance(obj, (np.integer, np.floating)):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif hasattr(obj, '__dict__'):
-                return vars(obj)
-            raise TypeError(f"Object of type {type(obj)} is not JSON serializable.")
+        # Every value is already a native python type, so the C encoder never needs a default callback
+        # dumps (unlike dump) uses the C encoder, new line on the end of each report (that's why jsonl instead of json)
+        jfile.write(json.dumps(report_json, check_circular=False) + "\n")
 
-        # Append repeat_data to the run file
-        with open(repeat_file_path.with_suffix(".jsonl"), 'a') as jfile:
-            json.dump(report_json, jfile, default=json_serializer)
-            jfile.write("\n")    # New line on the end of each report (that's why jsonl instead of json)
+    def release_distributions(self):
+        """Drop the per cell distributions once the report is written, they are only needed for plotting."""
+        self.propensity_distr = None
+        self.crowd_distr = None
+        self.pca_projection = None
 
     def get_metric_values(self):
-        log10_area = [
-                np.log10(area)
-                if area > 0 else 1e-6
-                for area in self.area
-            ]
-        total_length = [
-            value * Config().cell.CELL_SEGMENT_LENGTH
-            for value in self.number_of_cells
-        ]
-        hyphal_density = [
-            length / area
-            if area > 0 else 0
-            for length, area in zip(total_length, self.area)
-        ]
-        tip_density = [
-            active_tips / length
-            for active_tips, length in zip(self.num_active_cells, total_length)
-        ]
         complete_metrics = {
-            "log10_area": log10_area,
-            "total_length": total_length,
-            "hyphal_density": hyphal_density,
-            "tip_density": tip_density
+            "log10_area": self.log10_area,
+            "total_length": self.total_length,
+            "hyphal_density": self.hyphal_density,
+            "tip_density": self.tip_density
         }
         return {
             metric_name: value
@@ -224,11 +264,11 @@ class ColonyAnalysisReport(CAVisualize, InstanceTracker):
         }
 
     @staticmethod
-    def to_string(data):
-        return list(map(str, data))
-
-    def format_line(self, param_name: str, data):
-        return f"{param_name: <20}: {' '.join(self.to_string(data))}"
+    def format_line(param_name: str, data):
+        """Format all values of a parameter on a single line, numpy formats the whole array in one call."""
+        values: str = np.array2string(np.asarray(data).ravel(), max_line_width=10 ** 18, separator=' ',
+                                      threshold=np.inf, formatter={'float_kind': lambda x: f"{x:.6g}"})
+        return f"{param_name: <20}: {values[1:-1]}"
 
     def set_simulator(self, simulator):
         self.simulator = simulator
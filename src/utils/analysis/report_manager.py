@@ -1,4 +1,5 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from pathlib import Path
 from src.utils.load_config import ReporterConfig
@@ -11,44 +12,85 @@ class ReportManager:
     def __init__(self, report_config: ReporterConfig):
         self.reports: list[ColonyAnalysisReport] = []
         self.time_points: list[float] = report_config.TIME_POINTS
+        self.time_points_arr: np.ndarray = np.asarray(self.time_points, dtype=np.float64)
         self.next_tp: float = self.time_points[0]
         self.tp_tracker: int = 0
         self.save_as_json: bool = report_config.SAVE_AS_JSON_FORMAT
+        self.run_file = None    # Open repeat file, json reports are streamed to it instead of kept in memory
         ColonyAnalysisReport.report_params = report_config.ACTIVE_PARAMETERS
 
+    def open_run_file(self, repeat_file_path: Path):
+        """
+        Open the repeat file, so every json report is written as soon as it is made.
+        Without an open file (or in the formatted text mode) the reports are kept until write_reports_to_run_file.
+
+        :param repeat_file_path: Data storage path for the reports.
+        """
+        if self.save_as_json:
+            self.run_file = open(repeat_file_path.with_suffix(".jsonl"), 'a', buffering=1 << 20)
+
     def report(self, run_time):
-        """Generate reports at configured time points."""
-        while self.should_report(run_time):
-            self.increment_timing()
+        """Generate reports at configured time points, one for every time point passed since the last call."""
+        if not self.should_report(run_time):
+            return
+
+        passed_tp: int = int(np.searchsorted(self.time_points_arr, run_time, side="right"))
+        for _ in range(self.tp_tracker, passed_tp):
             self.make_report()
+        self.set_timing(passed_tp)
 
     def make_report(self):
         """Create a new analysis report."""
         report = ColonyAnalysisReport(Colony.instances)
         report.run_analysis()
-        self.reports.append(report)
+
+        if self.run_file is None:
+            self.reports.append(report)
+            return
+
+        # Write the report right away and drop the large distributions
+        report.write_json(self.run_file, self.time_points[report.index])
+        report.release_distributions()
 
     def should_report(self, run_time):
         return run_time >= self.next_tp
 
     def increment_timing(self):
         """Update the next reporting time point."""
-        self.tp_tracker += 1
+        self.set_timing(self.tp_tracker + 1)
 
-        if self.tp_tracker == len(self.time_points):
+    def set_timing(self, tp_index: int):
+        """
+        Move the next reporting time point to the given time point index.
+
+        :param tp_index: Index of the next time point that is not reported yet.
+        """
+        self.tp_tracker = tp_index
+
+        if self.tp_tracker >= len(self.time_points):
             # Prevents out of range error for the last time point
             self.next_tp = np.inf
         else:
             self.next_tp = self.time_points[self.tp_tracker]
 
     def write_reports_to_run_file(self, repeat_file_path: Path):
-        """Save all reports to the repeat file."""
-        for report in self.reports:
-            time_point: float = self.time_points[report.index]
-            if self.save_as_json:
-                report.save_as_json(repeat_file_path, time_point)
-            else:
-                report.save_as_formatted_report(repeat_file_path, time_point)
+        """Save all reports that weren't streamed yet to the repeat file and close the streamed file."""
+        if self.run_file is not None:
+            self.run_file.close()
+            self.run_file = None
+
+        if not self.reports:
+            return
+
+        # Open the repeat file once for all reports
+        run_file_path = repeat_file_path.with_suffix(".jsonl") if self.save_as_json else repeat_file_path
+        with open(run_file_path, 'a', buffering=1 << 20) as run_file:
+            for report in self.reports:
+                time_point: float = self.time_points[report.index]
+                if self.save_as_json:
+                    report.write_json(run_file, time_point)
+                else:
+                    report.write_formatted_report(run_file, time_point)
 
     @staticmethod
     def load_config(run_directory: Path) -> dict:
@@ -65,18 +107,27 @@ class ReportManager:
             return json.load(config_file)
 
     @staticmethod
-    def load_run_data(run_directory: Path) -> dict[str, list[dict]]:
-        """Load all repeat data from a run directory."""
-        run_data: dict[str, list[dict]] = {}
-        repeat_dirs = run_directory.glob("Repeat_*")
-        # repeat_file_names: map = map(str, run_directory.glob("Repeat_*.jsonl"))
-
-        for repeat_dir in repeat_dirs:
-            report_file = repeat_dir / repeat_dir.name
-            with open(report_file.with_suffix(".jsonl"), 'r') as run_file:
-                reports: list[dict] = [json.loads(report) for report in run_file]
-                run_data[repeat_dir.name] = reports
-        return run_data
+    def load_repeat_data(repeat_dir: Path) -> tuple[str, list[dict]]:
+        """
+        Load the reports of a single repeat.
+
+        :param repeat_dir: Directory of the repeat, holding a jsonl file with the same name.
+        :return: Name of the repeat and its reports.
+        """
+        report_file = repeat_dir / repeat_dir.name
+        # Read the whole file in one go, json.loads parses the byte lines directly
+        lines: list[bytes] = report_file.with_suffix(".jsonl").read_bytes().splitlines()
+        return repeat_dir.name, [json.loads(report) for report in lines if report]
+
+    @classmethod
+    def load_run_data(cls, run_directory: Path) -> dict[str, list[dict]]:
+        """Load all repeat data from a run directory, the repeat files are read concurrently."""
+        repeat_dirs: list[Path] = sorted(run_directory.glob("Repeat_*"))
+        if not repeat_dirs:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(8, len(repeat_dirs))) as executor:
+            return dict(executor.map(cls.load_repeat_data, repeat_dirs))
 
     @classmethod
     def create_plotter(cls, run_directory: Path) -> ReportPlotter:
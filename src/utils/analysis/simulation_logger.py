@@ -1,75 +1,55 @@
+import numpy as np
 from time import perf_counter
-from src.utils.load_config import LoggerConfig
+from src.utils.load_config import Config, LoggerConfig
+from src.utils.dynamic_array import DynamicArray, Dynamic2DArray
 from src.algorithm.chemistry.element import Element
 from src.algorithm.chemistry.reaction import Reaction
-from src.algorithm.event.state import State
-
-
-class LogState:
-    """Container for all logged simulation repeat_data at one time point"""
-    run_time: float
-    element_count: list[int]
-    reaction_propensities: list[float]
-    state_counts: list[int]
-    log_total_propensities: bool = True
-    log_events_total_propensity: bool = True
-
-    def set_time(self, run_time: float):
-        self.run_time = run_time
-
-    def set_element_count(self):
-        self.element_count = [element.amount for element in Element.instances]
-
-    def set_reaction_propensities(self):
-        self.reaction_propensities = [reaction.propensity.astype(float) for reaction in Reaction.instances]
-
-    def set_state_counts(self):
-        self.state_counts = [state.count for state in State.instances]
 
 
 class SimulationLogger:
     def __init__(self, config, log_interval: float = 1.0):
         self.config: LoggerConfig = config
-        self.log_states: list[LogState] = []
         self.next_log: float = 0.0
         self.log_interval: float = log_interval
+        self.log_count: int = 0     # Passed log time points, next_log is derived from it so it doesn't drift
+
+        # Logged data, one row per log time point (reserved for the whole run, grows if the run is extended)
+        n_logs: int = int(Config().run.END_TIME / log_interval) + 2
+        self.run_times: DynamicArray = DynamicArray(n_logs)
+        self.element_counts: Dynamic2DArray = Dynamic2DArray(n_logs, Element.total)   # Amounts can be fractional
+        self.reaction_propensities: Dynamic2DArray = Dynamic2DArray(n_logs, Reaction.total)
         self.real_time_start = 0
         self.simulator = None
 
     def log(self, run_time):
-        """Capture the current simulation state"""
+        """
+        Capture the current simulation state for every log time point that has passed.
+        Callers on the hot path check run_time >= next_log themselves before calling.
+        """
         if self.real_time_start == 0:
             self.real_time_start = perf_counter()
-        while self.should_log(run_time):
+        while run_time >= self.next_log:
             # Simple print statement
             passed_time = perf_counter() - self.real_time_start
             print(f"T: {run_time: <20}A0: {self.simulator.total_propensity: <20}rT: {passed_time}")
-            self.increment_log_timing()
+            self.log_count += 1
+            self.next_log = self.log_count * self.log_interval
             self.make_log(run_time)
 
     def make_log(self, run_time):
-        log_state = self.capture_state(run_time)
-        self.log_states.append(log_state)
-
-    def capture_state(self, run_time):
-        log_state = LogState()
+        """Write the current simulation state as a new row of the log arrays."""
+        self.run_times.append(run_time)
 
-        log_state.set_time(run_time)
+        # Disabled logs append a zero row (None), so all log arrays keep the same row per time point
+        element_counts = None
         if self.config.log_element_count:
-            log_state.set_element_count()
+            element_counts = np.fromiter((element.amount for element in Element.instances), np.float64, Element.total)
+        self.element_counts.append(element_counts)
 
+        reaction_propensities = None
         if self.config.log_reaction_propensity:
-            log_state.set_reaction_propensities()
-
-        return log_state
-
-    def should_log(self, run_time) -> bool:
-        """Check if it's time to log based on run_time and log_interval"""
-        return run_time >= self.next_log
-
-    def increment_log_timing(self):
-        """Increase the next logged time point"""
-        self.next_log += self.log_interval
+            reaction_propensities = Reaction.propensity_array.active    # Copied into the row in one go
+        self.reaction_propensities.append(reaction_propensities)
 
     def set_simulator(self, simulator):
         """Set the simulator reference."""
@@ -1,22 +1,135 @@
-from time import perf_counter
-from contextlib import contextmanager
-from collections import defaultdict
+import os
+import atexit
+from time import perf_counter_ns
+from contextlib import nullcontext
+from src.utils.load_config import Config
+from src.utils.perf_counters import PerfCounters
+
+
+class _Scope:
+    """Reusable context for one label of a Timer, only stores the start tick between enter and exit."""
+    __slots__ = ("line_times", "label", "start")
+
+    def __init__(self, line_times: dict[str, int], label: str):
+        self.line_times: dict[str, int] = line_times
+        self.label: str = label
+        self.start: int = 0
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.line_times[self.label] += perf_counter_ns() - self.start
+
+
+class _CounterScope(_Scope):
+    """Scope that also accumulates the hardware counter differences of its label."""
+    __slots__ = ("timer", "start_counts")
+
+    def __init__(self, timer: 'Timer', label: str):
+        super().__init__(timer.line_times, label)
+        self.timer: Timer = timer
+        self.start_counts: list[int] = []
+
+    def __enter__(self):
+        self.start_counts = self.timer.counters.read()
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.line_times[self.label] += perf_counter_ns() - self.start
+        self.timer.add_counts(self.label, self.start_counts)
 
 
 class Timer:
+    ENABLED: bool = Config().run.BENCHMARK                          # Read at import, when the timer decorators are applied
+    SEC_PER_TICK: float = 1e-9                                      # Times are accumulated as integer nanoseconds
+    _overhead: float = None                                         # Estimated seconds per start/end pair, see calibrate
+    COUNTERS: bool = os.environ.get("SIM_PERF_COUNTERS", "0") == "1"  # Set SIM_PERF_COUNTERS=1 to also count events
+
     def __init__(self):
-        self.line_times: dict[str, float] = defaultdict(float)
-        self._prev_times: dict[str, float] = defaultdict(float)
+        self.line_times: dict[str, int] = {}
+        self._prev_times: dict[str, int] = {}
+        self._scopes: dict[str, _Scope] = {}
+
+        # Optional hardware counters (Linux only), None when they are disabled or not available
+        self.counters: PerfCounters = PerfCounters.open() if self.ENABLED and self.COUNTERS else None
+        if self.counters is not None:
+            atexit.register(self.close)     # Timers live for the whole process, release the counters at exit
+        self.line_counts: dict[str, list[int]] = {}
+        self._prev_counts: dict[str, list[int]] = {}
 
     @property
-    def total_time(self):
-        return sum(self.line_times.values())
+    def total_time(self) -> float:
+        return sum(self.line_times.values()) * self.SEC_PER_TICK
+
+    @classmethod
+    def calibrate(cls, repeats: int = 1000) -> float:
+        """
+        Estimate the cost of one empty measurement by timing a loop of empty start/end pairs.
+        The estimate is computed once and shared by all timers.
+
+        :param repeats: Number of empty measurements to average over.
+        :return: Overhead in seconds per measurement.
+        """
+        if cls._overhead is None:
+            timer = cls()
+            scope = _Scope(timer.line_times, "calibrate")
+            timer.line_times["calibrate"] = 0
+            for _ in range(repeats):
+                with scope:
+                    pass
+            cls._overhead = timer.total_time / repeats
+            timer.close()
+        return cls._overhead
+
+    def close(self):
+        """Close the hardware counters of the timer, afterwards it can't measure anymore."""
+        if self.counters is not None:
+            self.counters.close()
+            self.counters = None
+
+    def register(self, label: str):
+        """Add a label with empty totals, so the measurements themselves only have to add to them."""
+        self.line_times.setdefault(label, 0)
+        if self.counters is not None:
+            self.line_counts.setdefault(label, [0] * len(self.counters.names))
+
+    def add_counts(self, label: str, start_counts: list[int]):
+        """
+        Add the counter differences since the start counts to the totals of a label.
+
+        :param label: Label of the measurement.
+        :param start_counts: Counter values read at the start of the measurement.
+        """
+        totals = self.line_counts[label]
+        for i, (start, end) in enumerate(zip(start_counts, self.counters.read())):
+            totals[i] += end - start
+
+    def format_counts(self, label: str) -> str:
+        """
+        :return: Instructions, instructions per cycle and cache misses of a label, empty without counters.
+        """
+        if self.counters is None:
+            return ""
+
+        counts = dict(zip(self.counters.names, self.line_counts[label]))
+        ipc = counts["instructions"] / counts["cycles"] if counts["cycles"] else 0.0
+        return f", instr. {counts['instructions']:.3g}, IPC {ipc:.2f}, cache misses {counts['cache_misses']:.3g}"
 
     def print_times(self):
-        indent_size = max(map(len, self.line_times.keys())) + 1
-        print(f"total time {self.total_time:>20}")
-        for label, time in self.line_times.items():
-            print(f"{label:>{indent_size}} took in total {time:<25}, perc. {time/self.total_time:.3f}")
+        # Labels are registered up front, skip the ones that never ran
+        line_times = {label: ticks * self.SEC_PER_TICK for label, ticks in self.line_times.items() if ticks > 0}
+        if not line_times:
+            return
+
+        total_time = sum(line_times.values())
+        indent_size = max(map(len, line_times.keys())) + 1
+        print(f"total time {total_time:>20}, overhead per measurement {self.calibrate():.3g}")
+        for label, time in line_times.items():
+            print(f"{label:>{indent_size}} took in total {time:<25}, perc. {time/total_time:.3f}"
+                  f"{self.format_counts(label)}")
 
     def measure_start(self, label: str):
         """
@@ -24,7 +137,10 @@ class Timer:
 
         :param label: Each label can hold a independent time, only correlates with an end measure with same label.
         """
-        self._prev_times[label] = perf_counter()
+        self.register(label)
+        if self.counters is not None:
+            self._prev_counts[label] = self.counters.read()
+        self._prev_times[label] = perf_counter_ns()
 
     def measure_end(self, label: str):
         """
@@ -32,12 +148,14 @@ class Timer:
 
         :param label: Calculate the time between start and end measure.
         """
-        self.line_times[label] += perf_counter() - self._prev_times[label]
+        self.line_times[label] += perf_counter_ns() - self._prev_times[label]
+        if self.counters is not None:
+            self.add_counts(label, self._prev_counts[label])
 
-    @contextmanager
     def measure(self, label: str):
         """
         Measures how much a set of code takes in given context window.
+        The context object is created once per label and reused, so a label can't be nested in itself.
 
         Use case:
         with timer_obj.measure(label):
@@ -45,10 +163,15 @@ class Timer:
 
         other code that is not benchmarked
         """
-        start = perf_counter()
-        yield
-        total = perf_counter() - start
-        self.line_times[label] += total
+        if not self.ENABLED:
+            return nullcontext()
+
+        scope = self._scopes.get(label)
+        if scope is None:
+            self.register(label)
+            scope = _Scope(self.line_times, label) if self.counters is None else _CounterScope(self, label)
+            self._scopes[label] = scope
+        return scope
 
     def measure_decorator(self, label: str):
         """
@@ -58,11 +181,31 @@ class Timer:
         @timer_obj.measure_decorator(label)
         def benchmarked_function():
             benchmark code
+
+        When the timers are disabled the function is returned undecorated, so it has no timing overhead.
         """
         def decorator(func):
+            if not self.ENABLED:
+                return func
+
+            self.register(label)
+            if self.counters is not None:
+                scope = _CounterScope(self, label)
+
+                def counted_wrapper(*args, **kwargs):
+                    with scope:
+                        return func(*args, **kwargs)
+
+                return counted_wrapper
+
+            line_times = self.line_times
+
             def wrapper(*args, **kwargs):
-                with self.measure(label):
+                start = perf_counter_ns()
+                try:
                     return func(*args, **kwargs)
+                finally:
+                    line_times[label] += perf_counter_ns() - start
 
             return wrapper
 
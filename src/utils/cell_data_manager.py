@@ -1,4 +1,3 @@
-import json
 import numpy as np
 from pathlib import Path
 from src.utils.dynamic_array import DynamicArray, Dynamic2DArray
@@ -9,84 +8,106 @@ from src.algorithm.cell_based.colony import Colony
 class CellDataManager:
     def __init__(self, data_path: Path):
         self.data_path: Path = data_path
-        self.array_data_path: Path = data_path.with_name(data_path.stem + "_arrays").with_suffix(".npz")
-        self.cell_data_path: Path = data_path.with_name(data_path.stem + "_cell_colony_data").with_suffix(".json")
-
-    def save_array_data(self):
-        np.savez_compressed(
-            self.array_data_path,
-            center=Cell.center_point_array.active,
-            end=Cell.end_point_array.active,
-            age=Cell.age_array.active,
-            crowding=Cell.crowding_index_array.active,
-            DivIVA=Cell.DivIVA_array.active
-        )
+        self.state_path: Path = data_path.with_name(data_path.stem + "_state")     # Directory with one .npy per array
+
+    @staticmethod
+    def get_array_data() -> dict[str, np.ndarray]:
+        return {
+            "center": Cell.center_point_array.active,
+            "end": Cell.end_point_array.active,
+            "age": Cell.age_array.active,
+            "crowding": Cell.crowding_index_array.active,
+            "DivIVA": Cell.DivIVA_array.active
+        }
+
+    @staticmethod
+    def get_cell_data() -> dict[str, np.ndarray]:
+        """
+        Cell class data, taken directly from the per cell arrays.
+        A missing parent is stored as -1, the children of all cells are stored flat with an indptr array.
+
+        :return: Arrays keyed on their name in the state file.
+        """
+        parent_index: np.ndarray = Cell.parent_index_array.active
+        return {
+            "cell_index": np.arange(Cell.total, dtype=np.int64),
+            "cell_parent": parent_index,
+            "cell_direction": Cell.direction_array.active,
+            "cell_length": Cell.length_array.active,
+            "cell_state_index": Cell.state_index_array.active,
+            "cell_colony_index": Cell.colony_index_array.active,
+            **CellDataManager.children_from_parents("cell_children", parent_index)
+        }
+
+    @staticmethod
+    def children_from_parents(name: str, parent_index: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        Derive the flat children and indptr arrays from the parent indexes.
+        Children are linked in the order they are created, so a stable sort on the parent gives the same order.
+
+        :param name: Name of the flat array, the indptr array gets the same name with an "_indptr" suffix.
+        :param parent_index: Parent index of every cell, -1 for a root cell.
+        :return: Both arrays keyed on their name.
+        """
+        child_index = np.flatnonzero(parent_index >= 0)
+        child_parent = parent_index[child_index]
+        indptr = np.zeros(parent_index.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(child_parent, minlength=parent_index.shape[0]), out=indptr[1:])
+        flat = child_index[np.argsort(child_parent, kind="stable")]
+        return {name: flat, name + "_indptr": indptr}
+
+    @staticmethod
+    def get_colony_data() -> dict[str, np.ndarray]:
+        colonies = Colony.instances
+        return {
+            "colony_index": np.array([colony.index for colony in colonies], dtype=np.int64),
+            "colony_root_index": np.array([colony.root.index for colony in colonies], dtype=np.int64),
+            **CellDataManager.pack_ragged("colony_cell_indexes", [colony.cell_indexes.active for colony in colonies])
+        }
+
+    @staticmethod
+    def pack_ragged(name: str, rows: list) -> dict[str, np.ndarray]:
+        """
+        Store rows of different lengths as one flat array and an indptr array (row i is flat[indptr[i]:indptr[i+1]]).
+
+        :param name: Name of the flat array, the indptr array gets the same name with an "_indptr" suffix.
+        :param rows: Sequences of indexes.
+        :return: Both arrays keyed on their name.
+        """
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        flat = np.concatenate(rows).astype(np.int64) if indptr[-1] else np.empty(0, dtype=np.int64)
+        return {name: flat, name + "_indptr": indptr}
 
     def save_cell_simulation_data(self):
-        # Save arrays
-        self.save_array_data()
-
-        # Save cell class data
-        cell_data: list[dict] = [
-            {
-                "index": cell.index,
-                "parent": cell.parent.index if cell.parent else None,
-                "children": [child.index for child in cell.children],
-                "direction": cell.direction,
-                "length": cell.length,
-                "state_index": cell.state.index,
-                "colony_index": cell.colony_index
-            }
-            for cell in Cell.instances
-        ]
-
-        # Save colony class data
-        colony_data: list[dict] = [
-            {
-                "index": colony.index,
-                "root_index": colony.root.index,
-                "cell_indexes": list(colony.cell_indexes.active)
-            }
-            for colony in Colony.instances
-        ]
-
-        self.save_to_json(cell_data, colony_data)
-
-    def save_to_json(self, cell_data, colony_data):
-        def json_serializer(obj):
-            """Handle non-JSON types automatically"""
-            if isinstance(obj, (np.integer, np.floating)):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif hasattr(obj, '__dict__'):
-                return vars(obj)
-            raise TypeError(f"Object of type {type(obj)} is not JSON serializable.")
-
-        with open(self.cell_data_path, 'w') as jfile:
-            json.dump(
-                {
-                    "cells": cell_data,
-                    "colonies": colony_data
-                },
-                jfile, default=json_serializer
-            )
+        # The arrays and the cell and colony class data all go into one directory of uncompressed .npy files
+        self.state_path.mkdir(parents=True, exist_ok=True)
+        state_data = {**self.get_array_data(), **self.get_cell_data(), **self.get_colony_data()}
+        for name, values in state_data.items():
+            np.save(self.state_path / f"{name}.npy", values)
+
+    def load_state_data(self) -> dict[str, np.ndarray]:
+        """
+        Memory map every stored array copy-on-write, so only the pages that are read are loaded from disk
+        and writes (e.g. when a loaded run is extended) never reach the stored files.
+
+        :return: Arrays keyed on their file name.
+        """
+        return {path.stem: np.load(path, mmap_mode="c") for path in self.state_path.glob("*.npy")}
 
     def load_all_simulation_data(self):
         # Reset the classes
         Cell.reset_class()
         Colony.reset_class()
 
+        state_data = self.load_state_data()
+
         # Load in array data
-        array_data = np.load(self.array_data_path)
-        self.load_array_data(array_data)
+        self.load_array_data(state_data)
 
         # Load in cell class data
-        all_data = json.load(open(self.cell_data_path))
-        cell_data = all_data["cells"]
-        self.load_cell_data(cell_data)
-        colony_data = all_data["colonies"]
-        self.load_colony_data(colony_data)
+        self.load_cell_data(state_data)
+        self.load_colony_data(state_data)
 
         # Make sure that all cells are relinked to the correct colony
         self.relink_cells_to_colony()
@@ -100,18 +121,35 @@ class CellDataManager:
         Cell.DivIVA_array = DynamicArray.load_data(array_data["DivIVA"])
 
     @staticmethod
-    def load_cell_data(cell_data):
-        for data in cell_data:
-            Cell.load_data(data)
+    def load_cell_data(state_data):
+        for index, parent, direction, length, state_index, colony_index in zip(
+                state_data["cell_index"].tolist(),
+                state_data["cell_parent"].tolist(),
+                state_data["cell_direction"].tolist(),
+                state_data["cell_length"].tolist(),
+                state_data["cell_state_index"].tolist(),
+                state_data["cell_colony_index"].tolist()):
+            Cell.load_data({
+                "index": index,
+                "parent": None if parent < 0 else parent,
+                "direction": direction,
+                "length": length,
+                "state_index": state_index,
+                "colony_index": None if colony_index < 0 else colony_index
+            })
 
     @staticmethod
-    def load_colony_data(colony_data):
-        for data in colony_data:
-            Colony.load_data(data)
+    def load_colony_data(state_data):
+        for root_index in state_data["colony_root_index"].tolist():
+            Colony.load_data({"root_index": root_index})
 
     @staticmethod
     def relink_cells_to_colony():
+        colony_cells: dict[int, list[Cell]] = {}
         for cell in Cell.instances:
-            Colony.instances[cell.colony_index].add_cell(cell)
+            colony_cells.setdefault(cell.colony_index, []).append(cell)
+
+        for colony_index, cells in colony_cells.items():
+            Colony.instances[colony_index].add_branch(cells)
 
 
@@ -3,6 +3,7 @@ from numba import njit
 
 
 class DynamicArray:
+    __slots__ = ("capacity", "row_size", "dtype", "arr", "resize_callbacks", "_active")
     resize_factor: float = 2    # Expansion factor when resizing
 
     def __init__(self, capacity: int = 1000, data_type: np.dtype = np.float64):
@@ -10,6 +11,8 @@ class DynamicArray:
         self.row_size: int = 0
         self.dtype = data_type
         self.arr: np.ndarray = self.make_empty_array()
+        self._active: np.ndarray = self.arr[:0]     # Cached view on the active rows, see set_row_size
+        self.resize_callbacks: list = []    # Called after the backing array is replaced
 
     def __repr__(self):
         return str(self.active)
@@ -18,10 +21,10 @@ class DynamicArray:
         return self.row_size
 
     def __getitem__(self, index):
-        return self.arr[:self.row_size][index]
+        return self._active[index]
 
     def __setitem__(self, index, value):
-        self.arr[:self.row_size][index] = value
+        self._active[index] = value
 
     def __mul__(self, other):
         return self.active * other
@@ -31,14 +34,24 @@ class DynamicArray:
 
     @property
     def active(self) -> np.ndarray:
-        return self.arr[:self.row_size]
+        return self._active
 
     @active.setter
     def active(self, value):
-        self.arr[:self.row_size] = value
+        self._active[:] = value
+
+    def set_row_size(self, row_size: int) -> None:
+        """
+        Set the number of active rows and refresh the cached view on them.
+        Has to be called whenever the row size changes or the backing array is replaced.
+
+        :param row_size: New number of active rows.
+        """
+        self.row_size = row_size
+        self._active = self.arr[:row_size]
 
     def make_empty_array(self):
-        return np.zeros(self.capacity, dtype=self.dtype)
+        return np.empty(self.capacity, dtype=self.dtype)   # Only the first row_size entries are ever read
 
     def update_index(self, index: int, data: np.dtype) -> None:
         self.arr[index] = data
@@ -47,26 +60,113 @@ class DynamicArray:
         return self.active.sum()
 
     def append(self, entry) -> None:
+        row_size = self.row_size
+
         # Check if next entry is outside the capacity bounds
-        if self.row_size == self.capacity:
+        if row_size == self.capacity:
             self.resize()   # Resize the array
 
-        self.update_index(self.row_size, entry)     # Add entry to end of the array
-        self.row_size += 1                          # Update current row_size
+        arr = self.arr
+        arr[row_size] = entry               # Add entry to end of the array
+        row_size += 1
+        self.row_size = row_size            # Update current row_size and the view on the active rows
+        self._active = arr[:row_size]
+
+    def extend(self, entries: np.ndarray) -> None:
+        """
+        Append multiple entries at once, resizing at most one time.
+
+        :param entries: Array of entries to add to the end of the array.
+        """
+        n = len(entries)
+        if self.row_size + n > self.capacity:
+            self.reserve(max(int(np.ceil(self.capacity * self.resize_factor)), self.row_size + n))
+
+        self.arr[self.row_size:self.row_size + n] = entries
+        self.set_row_size(self.row_size + n)
 
     def resize(self) -> None:
         """Smartly resize the array by allocating new capacity in one operation."""
-        new_capacity = int(np.ceil(self.capacity * self.resize_factor))
-        self.capacity = new_capacity
+        self.reserve(max(int(np.ceil(self.capacity * self.resize_factor)), 1))
+
+    def reserve(self, capacity: int) -> None:
+        """
+        Grow the array to at least the given capacity in a single allocation.
+        Does nothing when the current capacity is already large enough.
+
+        :param capacity: Minimal number of entries the array can hold before it needs to resize.
+        """
+        if capacity <= self.capacity:
+            return
+
+        self.capacity = capacity
         new_arr = self.make_empty_array()
-        new_arr[:self.arr.size] = self.arr  # Copy existing repeat_data
+        new_arr[:self.row_size] = self.arr[:self.row_size]  # Copy existing repeat_data
         self.arr = new_arr
+        self.set_row_size(self.row_size)
+        self.notify_resize()
+
+    def on_resize(self, callback) -> None:
+        """
+        Register a callback that is called every time the backing array is replaced,
+        so views on the backing array can be refreshed.
+
+        :param callback: Function without arguments.
+        """
+        self.resize_callbacks.append(callback)
+
+    def notify_resize(self) -> None:
+        for callback in self.resize_callbacks:
+            callback()
 
     def batch_remove(self, values: list):
-        """Remove multiple items from the array."""
-        self.arr = self.active[~np.isin(self.active, values)]
-        self.row_size = self.arr.size
-        self.capacity = self.arr.size
+        """
+        Remove multiple items from the array.
+        The remaining items are compacted in place, so the backing array and its capacity are kept.
+        """
+        drop_sorted = np.sort(np.asarray(values, dtype=self.dtype))
+        self.set_row_size(self._compact_excluding(self.arr, self.row_size, drop_sorted))
+
+    def keep_rows(self, keep: np.ndarray) -> None:
+        """
+        Keep only the active rows where the mask is True, compacted in place at the start of the backing array.
+
+        :param keep: Boolean mask over the active rows.
+        """
+        kept = self.active[keep]
+        self.arr[:kept.shape[0]] = kept
+        self.set_row_size(kept.shape[0])
+
+    def remove_rows(self, indexes) -> None:
+        """
+        Remove the entries at the given positions (not values), compacted in place like keep_rows.
+
+        :param indexes: Positions of the active rows to remove.
+        """
+        keep = np.ones(self.row_size, dtype=np.bool_)
+        keep[np.asarray(indexes, dtype=np.intp)] = False
+        self.keep_rows(keep)
+
+    @staticmethod
+    @njit(cache=True)
+    def _compact_excluding(arr: np.ndarray, row_size: int, drop_sorted: np.ndarray) -> int:
+        """
+        Move all items that are not in drop_sorted to the front of the array, keeping their order.
+
+        :param arr: Backing array, compacted in place.
+        :param row_size: Number of active items.
+        :param drop_sorted: Sorted values to remove.
+        :return: Number of remaining items.
+        """
+        write = 0
+        for read in range(row_size):
+            value = arr[read]
+            pos = np.searchsorted(drop_sorted, value)
+            if pos < drop_sorted.size and drop_sorted[pos] == value:
+                continue
+            arr[write] = value
+            write += 1
+        return write
 
     @classmethod
     def load_data(cls, values: np.ndarray):
@@ -75,20 +175,22 @@ class DynamicArray:
 
         darr = cls(values.shape[0], values.dtype)
         darr.arr = values
-        darr.row_size = values.shape[0]
+        darr.set_row_size(values.shape[0])
 
         return darr
 
 
 class Dynamic2DArray(DynamicArray):
+    __slots__ = ("crows", "ccols", "default_row")
+
     def __init__(self, capacity_rows=1000, capacity_columns=0, data_type=np.float64):
         self.crows = capacity_rows
         self.ccols = capacity_columns
         super().__init__(capacity_rows, data_type)
-        self.row_size = 0
+        self.default_row: np.ndarray = np.zeros(capacity_columns, dtype=data_type)     # Row appended by append()
 
     def make_empty_array(self):
-        return np.zeros((self.crows, self.ccols), dtype=self.dtype)
+        return np.empty((self.crows, self.ccols), dtype=self.dtype)
 
     @classmethod
     def load_data(cls, values: np.ndarray):
@@ -97,7 +199,7 @@ class Dynamic2DArray(DynamicArray):
 
         darr = cls(values.shape[0], values.shape[1], values.dtype)
         darr.arr = values
-        darr.row_size = values.shape[0]
+        darr.set_row_size(values.shape[0])
 
         return darr
 
@@ -109,18 +211,27 @@ class Dynamic2DArray(DynamicArray):
     def ndim(self):
         return self.row_size, self.ccols
 
+
     @property
-    def active(self) -> np.ndarray:
-        return self.arr[:self.row_size, :]
+    def active_flat(self) -> np.ndarray:
+        """
+        Flat view over the active rows.
+        The rows of the underlying array are C-contiguous, so the reshape never copies.
+        """
+        return self._active.reshape(-1)
 
     def add_column(self):
         """
         Add an extra column to the array with base value 0.
         """
         self.ccols += 1
-        new_arr = np.zeros((self.capacity, self.ccols), dtype=self.arr.dtype)
-        new_arr[:, :self.ccols - 1] = self.arr
+        new_arr = self.make_empty_array()
+        new_arr[:self.row_size, :-1] = self.arr[:self.row_size]    # Only the active rows are copied
+        new_arr[:self.row_size, -1] = 0
         self.arr = new_arr
+        self.set_row_size(self.row_size)
+        self.default_row = np.append(self.default_row, 0).astype(self.arr.dtype)
+        self.notify_resize()
 
     def update_row(self, row_index: int, data: np.ndarray):
         """
@@ -131,6 +242,15 @@ class Dynamic2DArray(DynamicArray):
         """
         self.arr[row_index, :] = data
 
+    def view_row(self, row_index: int) -> np.ndarray:
+        """
+        View on a single row of the backing array, only valid until the array is reallocated (see on_resize).
+
+        :param row_index: Index of the row.
+        :return: Row view, writes go directly into the array.
+        """
+        return self.arr[row_index]
+
     def update_col(self, col_index: int, data: np.ndarray) -> None:
         """
         Update a specific column in the event matrix with new values.
@@ -140,34 +260,59 @@ class Dynamic2DArray(DynamicArray):
         """
         self.active[:, col_index] = data
 
-    def append(self, entry) -> None:
+    def set_column_default(self, col_index: int, value) -> None:
+        """
+        Set the value a column gets when a row is appended without data, and fill the existing rows with it.
+
+        :param col_index: Index of the column.
+        :param value: Default value of the column.
+        """
+        self.default_row[col_index] = value
+        self.active[:, col_index] = value
+
+    def append(self, entry=None) -> None:
+        # Use the column defaults when no row data is given
+        if entry is None:
+            entry = self.default_row
+
+        row_size = self.row_size
+
         # Check if a resize is needed
-        if self.row_size == self.crows:
+        if row_size == self.crows:
             self.resize()
 
-        # Update the row with the current index
-        self.update_row(self.row_size, entry)
+        # Write the row at the current index
+        arr = self.arr
+        arr[row_size] = entry
 
-        # Update the new row size
-        self.row_size += 1
+        # Update the new row size and the view on the active rows
+        row_size += 1
+        self.row_size = row_size
+        self._active = arr[:row_size]
 
     def resize(self) -> None:
-        self.crows = int(np.ceil(self.crows * self.resize_factor))
-        new_arr = np.zeros((self.crows, self.ccols), dtype=self.arr.dtype)
+        self.reserve(max(int(np.ceil(self.crows * self.resize_factor)), 1))
+
+    def reserve(self, capacity_rows: int) -> None:
+        """
+        Grow the number of rows to at least the given capacity in a single allocation.
+        Does nothing when the current row capacity is already large enough.
+
+        :param capacity_rows: Minimal number of rows the array can hold before it needs to resize.
+        """
+        if capacity_rows <= self.crows:
+            return
+
+        self.crows = self.capacity = capacity_rows
+        new_arr = self.make_empty_array()
         new_arr[:self.row_size, :] = self.arr[:self.row_size, :]
         self.arr = new_arr
+        self.set_row_size(self.row_size)
+        self.notify_resize()
 
     def get_points(self, indexes):
-        return self.get_points_njit(self.active, indexes)
-
-    @staticmethod
-    @njit
-    def get_points_njit(darr: np.ndarray, indexes: np.ndarray):
-        n = indexes.size
-        points = np.empty((n, darr.shape[1]), dtype=darr.dtype)
-        for i in range(n):
-            points[i] = darr[indexes[i]]
-        return points
+        """Copy of the given rows, gathered in a single numpy take."""
+        return np.take(self.active, indexes, axis=0)
 
 
 
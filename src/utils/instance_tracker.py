@@ -5,7 +5,9 @@ class InstanceTracker:
     """
     Tracks all the instances of a class.
     Each instance has a index that can be tracked back the instance list.
+    Defines no slots itself, so subclasses can use __slots__ (with "index") to drop the instance __dict__.
     """
+    __slots__ = ()
     total: int = 0
     instances: list = []
 
@@ -1,13 +1,23 @@
 import yaml
+import numpy as np
 from dataclasses import dataclass, field
 from pathlib import Path
 
+try:
+    from yaml import CSafeLoader as YamlLoader   # libyaml backed loader, much faster than the pure Python one
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 
 @dataclass
 class RunConfig:
     RUN_NAME: str
     RUN_REPEATS: int
     END_TIME: float
+    INITIAL_CELL_CAPACITY: int = 1000   # Rows reserved up front in the per-cell arrays
+    BENCHMARK: bool = True              # Time every simulation step, disable to use the faster untimed main loop
+    RUN_WORKERS: int = 1                # Processes that run repeats in parallel, 1 runs them one by one in this process
+    SEED: int = None                    # Seed of the random number generators, None draws a fresh random seed
 
 
 @dataclass
@@ -98,10 +108,8 @@ class ReporterConfig:
     )
 
     def format_time_points(self, run_config: RunConfig):
-        self.TIME_POINTS: list[float] = [
-            i * self.REPORT_INTERVAL
-            for i in range(int(run_config.END_TIME / self.REPORT_INTERVAL) + 1)
-        ]
+        n_points = int(run_config.END_TIME / self.REPORT_INTERVAL) + 1
+        self.TIME_POINTS: list[float] = (np.arange(n_points) * self.REPORT_INTERVAL).tolist()
 
 
 @dataclass
@@ -141,5 +149,5 @@ class Config:
     def _load_yaml(cls, yaml_file_name, config_cls):
         yaml_path = cls.config_path / yaml_file_name
         with open(yaml_path) as file:
-            data = yaml.safe_load(file)
+            data = yaml.load(file, Loader=YamlLoader)
         return config_cls(**data)
@@ -0,0 +1,63 @@
+import os
+import sys
+import ctypes
+import struct
+import platform
+
+
+class PerfCounters:
+    """
+    User space hardware counters of the current process, read through the Linux perf_event_open syscall.
+    The counters run from the moment they are opened, a measurement is the difference between two reads.
+    """
+    __slots__ = ("names", "fds")
+    events: dict[str, int] = {          # PERF_COUNT_HW_* config values of the PERF_TYPE_HARDWARE events
+        "cycles": 0,
+        "instructions": 1,
+        "cache_misses": 3
+    }
+    syscall_numbers: dict[str, int] = {"x86_64": 298, "aarch64": 241}
+    _attr_size: int = 128               # Size of the perf_event_attr struct that is passed to the kernel
+    _exclude_kernel_hv: int = (1 << 5) | (1 << 6)   # perf_event_attr flag bits, only count user space
+
+    def __init__(self, names: tuple[str, ...], fds: list[int]):
+        self.names: tuple[str, ...] = names
+        self.fds: list[int] = fds
+
+    @classmethod
+    def open(cls, names: tuple[str, ...] = ("instructions", "cycles", "cache_misses")) -> 'PerfCounters':
+        """
+        Open a counter for every given event.
+
+        :param names: Names of the events, keys of PerfCounters.events.
+        :return: Opened counters, None when the platform, kernel or hardware doesn't provide them (e.g. most VMs).
+        """
+        syscall_number = cls.syscall_numbers.get(platform.machine())
+        if syscall_number is None or platform.system() != "Linux":
+            return None
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        fds: list[int] = []
+        for name in names:
+            attr = ctypes.create_string_buffer(cls._attr_size)
+            struct.pack_into("IIQ", attr, 0, 0, cls._attr_size, cls.events[name])   # type, size, config
+            struct.pack_into("Q", attr, 40, cls._exclude_kernel_hv)                  # flags
+            fd = libc.syscall(syscall_number, attr, 0, -1, -1, 0)   # This process, any cpu, no group, no flags
+            if fd < 0:
+                for opened in fds:
+                    os.close(opened)
+                return None
+            fds.append(fd)
+
+        return cls(names, fds)
+
+    def read(self) -> list[int]:
+        """
+        :return: Current count of every counter, in the order of the names.
+        """
+        return [int.from_bytes(os.read(fd, 8), sys.byteorder) for fd in self.fds]
+
+    def close(self) -> None:
+        for fd in self.fds:
+            os.close(fd)
+        self.fds = []
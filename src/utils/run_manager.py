@@ -4,6 +4,8 @@ import sys
 import os
 import json
 import warnings
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from importlib.metadata import version
 from src.utils.cell_data_manager import CellDataManager
@@ -31,6 +33,7 @@ class RunManager:
         self.project_root: Path = Path(project_root)
         self.current_run_dir: Path = self.project_root / "data" / "runs" / config.run.RUN_NAME
         self.repeats: int = config.run.RUN_REPEATS
+        self.workers: int = max(1, min(config.run.RUN_WORKERS, self.repeats, os.cpu_count() or 1))
         self.plotter: ReportPlotter or None = None
 
         self.run_start: float = 0
@@ -41,17 +44,28 @@ class RunManager:
         """
         Start simulating multiple repeated runs based on the initializer.
         Automatically creates a run directory with analysis reports and run configs.
+        With multiple workers the named repeats run in separate processes,
+        afterwards the saved end state of the last repeat is loaded back into self.simulation.
         """
         self.make_run_directory()
 
         # Start run
         self.run_start = perf_counter()
-        for repeat_index in range(1, self.repeats + 1):
-            # Run simulation
-            self.simulation = self.initialize_simulation()
-            self.simulation.run()
+        repeat_indexes = range(1, self.repeats + 1)
+        # Independent seed per repeat, derived from run.SEED so the repeats of a seeded run are reproducible
+        repeat_seeds: list[np.random.SeedSequence] = np.random.SeedSequence(Config().run.SEED).spawn(self.repeats)
+        if self.workers > 1 and self.name != "":
+            # Repeats are independent, each worker process runs and saves whole repeats on its own
+            repeat_paths = [self.get_repeat_path(repeat_index) for repeat_index in repeat_indexes]
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     initializer=_init_worker, initargs=(Config(),)) as executor:
+                list(executor.map(self.simulate_repeat, repeat_paths, repeat_seeds))
 
-            self.save_data(repeat_index)
+            self.simulation = self.initialize_simulation()
+            self.load_cell_data(self.repeats)
+        else:
+            for repeat_index, repeat_seed in zip(repeat_indexes, repeat_seeds):
+                self.run_repeat(repeat_index, repeat_seed)
         self.run_total_time = perf_counter() - self.run_start
 
         # Save config
@@ -59,9 +73,38 @@ class RunManager:
             self.save_config()
             self.save_config_json()
 
+    def run_repeat(self, repeat_index: int, seed: np.random.SeedSequence = None):
+        """
+        Simulate and save a single repeat.
+
+        :param repeat_index: Index of the repeat, used for its data storage path.
+        :param seed: Seed of the repeat, defaults to run.SEED.
+        """
+        repeat_path: Path = self.get_repeat_path(repeat_index) if self.name != "" else None
+        self.simulation = self.simulate_repeat(repeat_path, seed)
+
+    @classmethod
+    def simulate_repeat(cls, repeat_path: Path = None, seed: np.random.SeedSequence = None) -> GillespieSimulator:
+        """
+        Simulate a single repeat from a fresh initialization.
+
+        :param repeat_path: Data storage path of the repeat, the report and end state are only saved when given.
+        :param seed: Seed of the repeat, defaults to run.SEED.
+        :return: The finished simulation.
+        """
+        simulation = cls.initialize_simulation(seed)
+        if repeat_path is not None:
+            simulation.reporter.open_run_file(repeat_path)
+        simulation.run()
+
+        if repeat_path is not None:
+            cls.save_report(simulation.reporter, repeat_path)
+            cls.save_simulation_state(repeat_path)
+        return simulation
+
     @staticmethod
-    def initialize_simulation():
-        return init()
+    def initialize_simulation(seed: np.random.SeedSequence = None):
+        return init(seed)
 
     def save_data(self, repeat_index):
         if not self.name == "":
@@ -71,8 +114,8 @@ class RunManager:
 
     def get_repeat_path(self, repeat_index):
         repeat_dir = self.current_run_dir / f"Repeat_{repeat_index}"
-        os.makedirs(repeat_dir, exist_ok=True)
-        return self.current_run_dir / f"Repeat_{repeat_index}" / f"Repeat_{repeat_index}"
+        repeat_dir.mkdir(exist_ok=True)
+        return repeat_dir / repeat_dir.name
 
     def plot_run(self, repeat_index=None):
         # Ask the user for plot confirmation
@@ -111,15 +154,14 @@ class RunManager:
             # Skip when no run name
             return
 
-        os.makedirs(Path(self.project_root) / "data" / "runs", exist_ok=True)
         try:
-            os.makedirs(self.current_run_dir)
+            self.current_run_dir.mkdir(parents=True)
         except FileExistsError as error:
             raise FileExistsError(
                 f"{error}\n"
                 f"Error: Run directory '{self.name}' already exists.\n\n"
                 f"[Tip] Make sure that the run name is unique or delete the existing folder.\n"
-                f"Look in '{os.path.abspath(f'{self.project_root}/runs')}' for existing run names.\n"
+                f"Look in '{self.current_run_dir.parent.resolve()}' for existing run names.\n"
             )
 
     def save_config(self):
@@ -131,24 +173,27 @@ class RunManager:
         Update the RunManager.CONFIGS if any new configs classes need to be saved in the file.
         """
         config_file: Path = self.current_run_dir / "configs"
-        with open(config_file, 'w') as file:
-            file.write(f"[{self.name}]\n")
-            time_stamp: str = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
-            file.write(f"Run start date and time: {time_stamp}\n")
-            file.write(f"Total run time: {timedelta(seconds=self.run_total_time)}\n")
-
-            for config in self.CONFIGS:
-                file.write(f"\n")
-                file.write(f"{config.__class__.__name__}:\n")
-                class_variables = self.get_class_vars(config)
-                for name, value in class_variables.items():
-                    file.write(f"\t{name}: {value}\n")
-
-            file.write("\nVersions\n")
-            file.write(f"\tPython: {sys.version.split()[0]}\n")
-            file.write(f"\tnumpy: {version('numpy')}\n")
-            file.write(f"\tmatplotlib: {version('matplotlib')}\n")
-            file.write(f"\tscipy: {version('scipy')}\n")
+        time_stamp: str = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
+        parts: list[str] = [
+            f"[{self.name}]\n",
+            f"Run start date and time: {time_stamp}\n",
+            f"Total run time: {timedelta(seconds=self.run_total_time)}\n"
+        ]
+
+        for config in self.CONFIGS:
+            parts.append(f"\n{config.__class__.__name__}:\n")
+            parts.extend(f"\t{name}: {value}\n" for name, value in self.get_class_vars(config).items())
+
+        parts.extend([
+            "\nVersions\n",
+            f"\tPython: {sys.version.split()[0]}\n",
+            f"\tnumpy: {version('numpy')}\n",
+            f"\tmatplotlib: {version('matplotlib')}\n",
+            f"\tscipy: {version('scipy')}\n"
+        ])
+
+        # Written in one go
+        config_file.write_text("".join(parts))
 
     def save_config_json(self):
         """
@@ -186,7 +231,8 @@ class RunManager:
         reporter.write_reports_to_run_file(repeat_path)
         ColonyAnalysisReport.reset_class()
 
-    def save_simulation_state(self, repeat_path: Path):
+    @staticmethod
+    def save_simulation_state(repeat_path: Path):
         """
         Stores the end state of the cells and colonies.
         Stored data can be loaded in for extending a run.
@@ -216,3 +262,12 @@ class RunManager:
                 and not callable(value)
                 and not isinstance(value, (classmethod, staticmethod, property))
                 }
+
+
+def _init_worker(config: Config):
+    """
+    Set up a worker process of RunManager.start, the configs are sent once per worker instead of once per repeat.
+
+    :param config: Configs of the parent process, replaces the configs loaded by the worker.
+    """
+    Config._instance = config
@@ -1,8 +1,8 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
+from scipy.ndimage import maximum_filter
 from pathlib import Path
 
 from src.utils.dynamic_array import DynamicArray, Dynamic2DArray
@@ -30,12 +30,6 @@ class Animator(ABC):
         pass
 
 
-@dataclass
-class Snapshot:
-    cell_positions: np.ndarray      # Size(N_cells, 2)
-    parameter_value: np.ndarray     # Size(N_cells, 1)
-
-
 class CellGrowthAnimator(Animator):
     dpi = 300
 
@@ -46,12 +40,20 @@ class CellGrowthAnimator(Animator):
         self.space_size = space.size
         self.cells = cells
         self.dot_size = dot_size
+        # dot_size is a scatter marker area in points^2, its width in points converted to raster pixels
+        self.marker_pixels: int = max(1, round(np.sqrt(dot_size) * self.dpi / 72))
 
-        # Snapshot settings
+        # Snapshot settings, cell positions never change once added so a snapshot only stores its cell count
+        # and the values of its cells (back to back in one buffer for all snapshots)
         self.position_array: Dynamic2DArray = Cell.center_point_array
         self.param_array: DynamicArray = getattr(Cell, f"{cell_parameter}_array")
         self.param_max: float = 0
-        self.snapshots: list[Snapshot] = []
+        n_frames = int(end_time * fps) + 2
+        self.frame_cell_counts: DynamicArray = DynamicArray(n_frames, np.int64)
+        self.frame_offsets: DynamicArray = DynamicArray(n_frames, np.int64)     # Start of each frame in frame_values
+        self.frame_max_values: DynamicArray = DynamicArray(n_frames)
+        self.frame_values: DynamicArray = DynamicArray(data_type=np.float32)
+        self.cell_pixels: np.ndarray = None     # Raster pixel of every cell, set once the simulation has ended
 
         # Frame settings
         self.end_time = end_time
@@ -66,10 +68,12 @@ class CellGrowthAnimator(Animator):
         self.ax.set_xlim(0, space.size)
         self.ax.set_ylim(0, space.size)
 
-        # Initialize scatter with dummy point (removed later)
-        self.scatter = self.ax.scatter([], [], c=[], s=dot_size,
-                                       cmap=color_map, linewidths=0)
-        self.cbar = self.fig.colorbar(self.scatter, ax=self.ax)
+        # The cells are binned into a raster image with the saved resolution instead of drawn as scatter points
+        self.raster_size: int = int(self.dpi * min(self.fig.get_size_inches()))
+        self.image = self.ax.imshow(np.full((self.raster_size, self.raster_size), np.nan),
+                                    extent=(0, space.size, 0, space.size), origin="lower",
+                                    cmap=color_map, interpolation="nearest")
+        self.cbar = self.fig.colorbar(self.image, ax=self.ax)
         colorbar_title = cell_parameter.replace('_', ' ').title()
         self.cbar.set_label(colorbar_title)
         self.max_label = self.ax.text(
@@ -80,36 +84,90 @@ class CellGrowthAnimator(Animator):
         self.initialize()
 
     def initialize(self):
-        """Initialize the spore cells"""
-        self.scatter.set_offsets(Cell.center_point_array.active)
-        self.save_snapshot()
-        return self.scatter,
+        """Initialize the spore cells, also used to draw the first frame when the animation starts"""
+        if len(self.frame_cell_counts) == 0:
+            self.save_snapshot()
+        return self.update(0)
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.frame_cell_counts)
 
     def snapshot_schedule(self, current_time):
         """
         Store a snapshot if enough time has passed.
         When there are multiple frame updates without a simulation update,
-        then multiple copies of the same snapshot are stored.
+        then the extra frames reuse the values of the first snapshot instead of copying them again.
         """
+        if current_time <= self.next_frame:
+            return
+
+        self.save_snapshot()
+        self.next_frame += self.sec_per_frame
         while current_time > self.next_frame:
-            self.save_snapshot()
+            self.repeat_snapshot()
             self.next_frame += self.sec_per_frame
 
     def save_snapshot(self):
         """Stores the current run repeat_data as a snapshot, stored snapshots are used when rendering an animation"""
-        self.param_max = max(self.param_max, max(self.param_array.active))
-        sorted_indexes = np.argsort(self.param_array.active)
-        self.snapshots.append(
-            Snapshot(self.position_array.active[sorted_indexes], self.param_array.active[sorted_indexes])
-        )
+        values: np.ndarray = self.param_array.active
+        max_value = float(values.max())
+        self.param_max = max(self.param_max, max_value)
+
+        self.frame_offsets.append(len(self.frame_values))
+        self.frame_values.extend(values)
+        self.frame_cell_counts.append(values.shape[0])
+        self.frame_max_values.append(max_value)
+
+    def repeat_snapshot(self):
+        """Stores a frame that points at the values of the last snapshot"""
+        self.frame_offsets.append(self.frame_offsets[-1])
+        self.frame_cell_counts.append(self.frame_cell_counts[-1])
+        self.frame_max_values.append(self.frame_max_values[-1])
+
+    def pixel_indexes(self, positions: np.ndarray) -> np.ndarray:
+        """
+        :param positions: Cell positions, one (x, y) per row.
+        :return: Flat raster pixel of every position, -1 for positions outside of the space.
+        """
+        n = self.raster_size
+        pixels = np.floor(positions * (n / self.space_size)).astype(np.int64)
+        inside = np.all((pixels >= 0) & (pixels < n), axis=1)
+        return np.where(inside, pixels[:, 1] * n + pixels[:, 0], -1)
+
+    def rasterize(self, frame: int, cell_pixels: np.ndarray = None) -> np.ndarray:
+        """
+        Bin the cells of a snapshot into a square raster, each pixel gets the maximum value of its cells.
+
+        :param frame: Index of the snapshot.
+        :param cell_pixels: Precomputed pixel indexes of at least the cells in the snapshot, computed when not given.
+        :return: Raster of shape (raster_size, raster_size) with y as rows, NaN (not drawn) for empty pixels.
+        """
+        n = self.raster_size
+        n_cells = self.frame_cell_counts[frame]
+        start = self.frame_offsets[frame]
+        values = self.frame_values.active[start:start + n_cells]
+        if cell_pixels is None:
+            cell_pixels = self.pixel_indexes(self.position_array.active[:n_cells])
+        pixels = cell_pixels[:n_cells]
+        inside = pixels >= 0
+
+        raster = np.full(n * n, -np.inf)
+        np.maximum.at(raster, pixels[inside], values[inside])
+        raster = raster.reshape(n, n)
+
+        if self.marker_pixels > 1:
+            raster = maximum_filter(raster, size=self.marker_pixels, mode="constant", cval=-np.inf)
+
+        raster[np.isneginf(raster)] = np.nan
+        return raster
 
     def update(self, frame):
         """Update plot with cells up to the current frame."""
-        snapshot = self.snapshots[frame]
-        self.scatter.set_offsets(snapshot.cell_positions)
-        self.scatter.set_array(snapshot.parameter_value)
-        self.max_label.set_text(f"Max: {snapshot.parameter_value[-1]:.3f}")
-        return self.scatter,
+        # The colormap is applied by the image when it is drawn, so only one frame is colored at a time
+        self.image.set_data(self.rasterize(frame, self.cell_pixels))
+        self.max_label.set_text(f"Max: {self.frame_max_values[frame]:.3f}")
+        return self.image,
 
     def render(self, save_path=None, overwrite=False, speed=1):
         """
@@ -119,13 +177,14 @@ class CellGrowthAnimator(Animator):
         :param save_path: Filename (e.g., "growth.mp4") to save in 'utils/animations/'.
         :param overwrite: If current file name already exists, overwrite with new animation.
         """
-        self.scatter.set_clim(0, self.param_max)
+        self.image.set_clim(0, self.param_max)
+        self.cell_pixels = self.pixel_indexes(self.position_array.active)   # Computed once for the cells of all frames
 
         anim = FuncAnimation(
             self.fig,
             self.update,
             init_func=self.initialize,
-            frames=len(self.snapshots),
+            frames=self.frame_count,
             interval=self.sec_per_frame * 1000 * speed,     # Seconds to milliseconds times the speed
             blit=True
         )
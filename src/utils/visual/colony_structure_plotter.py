@@ -1,7 +1,6 @@
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import numpy as np
-from scipy.spatial import ConvexHull
 from src.algorithm.cell_based.cell import Cell
 from src.algorithm.cell_based.colony import Colony
 
@@ -45,7 +44,7 @@ class ColonyPlotter:
             self._plot_simple(points)
 
         if with_hull:
-            self._add_hull(points)
+            self._add_hull(colony)
 
         # Adjust plot appearance
         self.ax.axis("equal")
@@ -53,11 +52,26 @@ class ColonyPlotter:
 
     def _plot_paremeter(self, colony: Colony, points: np.ndarray, parameter: str,
                         sort_values: bool, cmap: str):
-        values = getattr(Cell, f"{parameter}_array").active[colony.cell_indexes]
+        values = getattr(Cell, f"{parameter}_array").active[colony.cell_indexes.active]
+
+        if len(points) > self.pixel_count():
+            # More cells than pixels, draw the mean value per pixel as an image instead of every single cell
+            sums, extent = self._bin_points(points, values)
+            counts, _ = self._bin_points(points)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean_values = np.where(counts > 0, sums / counts, np.nan)
+            self.scatter = self.ax.imshow(mean_values.T, extent=extent, origin="lower",
+                                          cmap=cmap, interpolation="nearest")
+            self.cb = self.fig.colorbar(self.scatter, ax=self.ax)
+            self.cb.set_label(parameter.replace('_', ' ').title())
+            return
 
         if sort_values:
-            # Sort from the lowest value to highest
-            sort_indexes = np.argsort(values)
+            # Only the highest values need to be drawn last (on top), so only that tail is fully sorted
+            top_count = max(1, int(0.05 * len(values)))
+            partition = np.argpartition(values, -top_count) if len(values) > top_count else np.arange(len(values))
+            top = partition[-top_count:]
+            sort_indexes = np.concatenate([partition[:-top_count], top[np.argsort(values[top])]])
             points = points[sort_indexes]
             values = values[sort_indexes]
 
@@ -73,15 +87,42 @@ class ColonyPlotter:
         self.cb.set_label(parameter.replace('_', ' ').title())
 
     def _plot_simple(self, points: np.ndarray):
+        if len(points) > self.pixel_count():
+            # More cells than pixels, fill every pixel that holds at least one cell
+            counts, extent = self._bin_points(points)
+            self.ax.imshow(np.where(counts > 0, 1.0, np.nan).T, extent=extent, origin="lower",
+                           cmap="binary", vmin=0, vmax=1, interpolation="nearest")
+            return
+
         self.ax.scatter(
             points[:, 0], points[:, 1],
             c='black',
             s=self.dotsize, linewidths=self.linewidth
         )
 
-    def _add_hull(self, points: np.ndarray):
-        hull = ConvexHull(points)
-        hull_points = points[hull.vertices]
+    def pixel_count(self) -> int:
+        """Number of pixels in the current figure, from this many cells a scatter draws more points than pixels."""
+        return int(self.fig.dpi ** 2 * np.prod(self.fig.get_size_inches()))
+
+    def _bin_points(self, points: np.ndarray, weights: np.ndarray = None) -> tuple[np.ndarray, tuple]:
+        """
+        Bin the points into square pixels at the figure resolution.
+
+        :param points: Points, one (x, y) per row.
+        :param weights: Value of each point, the bins count the points when not given.
+        :return: Binned (weighted) counts with x as rows, and the (left, right, bottom, top) extent of the bins.
+        """
+        x_min, y_min = points.min(axis=0)
+        x_max, y_max = points.max(axis=0)
+        pixel_size = max(x_max - x_min, y_max - y_min) / (self.fig.dpi * min(self.fig.get_size_inches()))
+        bins = (max(1, int(np.ceil((x_max - x_min) / pixel_size))), max(1, int(np.ceil((y_max - y_min) / pixel_size))))
+
+        binned, x_edges, y_edges = np.histogram2d(points[:, 0], points[:, 1], bins=bins, weights=weights)
+        return binned, (x_edges[0], x_edges[-1], y_edges[0], y_edges[-1])
+
+    def _add_hull(self, colony: Colony):
+        # The colony keeps its hull up to date incrementally, picking the hull algorithm on the number of points
+        hull_points = colony.update_hull()
         closed_hull = np.concatenate([hull_points, hull_points[:1]])
         self.ax.plot(closed_hull[:, 0], closed_hull[:, 1], 'r-', lw=2, label='Convex Hull')
 
@@ -91,7 +132,7 @@ class ColonyPlotter:
         points = colony.cell_points
         x_data = points[:, 0]
         y_data = points[:, 1]
-        crowding_index = Cell.crowding_index_array.active[colony.cell_indexes]
+        crowding_index = Cell.crowding_index_array.active[colony.cell_indexes.active]
         crowding_index += 1
         crowding_index **= -1
 
@@ -1,3 +1,4 @@
+import numpy as np
 import matplotlib.pyplot as plt
 
 
@@ -20,12 +21,20 @@ class ReportPlotter:
     def __init__(self, config: dict, run_data: dict[str, list[dict]]):
         self.config: dict[str, dict] = config["configs"]
         self.run_data: dict[str, list[dict]] = run_data
+        self.run_data_by_index: dict[int, list[dict]] = {   # Repeat number parsed from names like "Repeat_12"
+            int(name.removesuffix(".jsonl").rsplit("_", 1)[-1]): data
+            for name, data in run_data.items()
+        }
 
     def plot_run(self, repeat_index: int = None):
         """Plot either all repeats or a specific repeat if index is provided."""
-        for repeat, data in self.run_data.items():
-            if not repeat_index or str(repeat_index) == repeat.removesuffix(".jsonl")[-1]:
-                self.plot_repeat(data)
+        if repeat_index is None:
+            repeats = self.run_data_by_index.values()
+        else:
+            repeats = [self.run_data_by_index[repeat_index]]
+
+        for data in repeats:
+            self.plot_repeat(data)
 
     def plot_repeat(self, repeat_data: list[dict]):
         """Plot all parameters and metrics for a single repeat."""
@@ -34,28 +43,41 @@ class ReportPlotter:
         time_interval = self.config["ReporterConfig"]["REPORT_INTERVAL"]
 
         base_width = 0.9 * time_interval
-        time_points = [report["Time_Point"] for report in repeat_data]
+        # The first report (time point 0) is left out of the plots
+        time_points: np.ndarray = np.asarray([report["Time_Point"] for report in repeat_data[1:]], dtype=np.float64)
+
+        # Collect the values of every plotted name in one pass over the reports
+        by_name: dict[str, list] = {name: [] for name in parameter_names + metric_names}
+        for report in repeat_data:
+            parameters: dict = report["Parameters"]
+            for name, values in by_name.items():
+                values.append(parameters[name])
+
+        # One row per plotted name, all sharing the time axis
+        row_count = len(parameter_names) + len(metric_names)
+        fig, axes = plt.subplots(nrows=row_count, figsize=(10, 6 * row_count), sharex=True, squeeze=False)
+        axes = axes[:, 0]
 
-        def plot_category(category_type: str, names: list[str]):
-            for name in names:
+        def plot_category(category_type: str, names: list[str], first_row: int):
+            for ax, name in zip(axes[first_row:], names):
                 # print(name, self.param_units[name])
-                plt.figure(figsize=(10, 6))
-                violin_data = [report["Parameters"][name] for report in repeat_data]
-                self._plot_violin(violin_data[1:], base_width, time_points[1:])
+                violin_data = by_name[name]
+                self._plot_violin(ax, violin_data[1:], base_width, time_points)
                 formatted_name = name.replace("_", " ").title()
-                plt.title(f"{category_type.title()}: {formatted_name}", size=24)
-                plt.xlabel("Time Point", size=18)
-                plt.ylabel(self.param_units[name], size=18)
-                plt.tick_params(axis='both', which='major', labelsize=14)
-                plt.ylim(bottom=0)
+                ax.set_title(f"{category_type.title()}: {formatted_name}", size=24)
+                ax.set_ylabel(self.param_units[name], size=18)
+                ax.tick_params(axis='both', which='major', labelsize=14)
+                ax.set_ylim(bottom=0)
 
-        plot_category("Parameter", parameter_names)
-        plot_category("Metric", metric_names)
+        plot_category("Parameter", parameter_names, 0)
+        plot_category("Metric", metric_names, len(parameter_names))
+        axes[-1].set_xlabel("Time Point", size=18)
+        fig.tight_layout()
         plt.show()
 
     @staticmethod
-    def _plot_violin(violin_data: list, width: float, positions: list[float]):
-        violin_parts = plt.violinplot(
+    def _plot_violin(ax: plt.Axes, violin_data: list, width: float, positions: np.ndarray):
+        violin_parts = ax.violinplot(
             violin_data,
             widths=width,
             positions=positions,
@@ -64,7 +86,5 @@ class ReportPlotter:
             showextrema=False
         )
 
-        # Add borders to each violin
-        for pc in violin_parts['bodies']:
-            pc.set_edgecolor('black')
-            pc.set_linewidth(1.5)
+        # Add borders to all violins at once
+        plt.setp(violin_parts['bodies'], edgecolor='black', linewidth=1.5)